@@ -0,0 +1,59 @@
+from generic_serializer import SerializableModelFilter
+from test_app.models import DataProvider, TestModel1, TestModel2, TestModel3
+
+DATA_PROVIDER_FILTER = SerializableModelFilter(
+    max_depth=1,
+    exclude_labels=("dataprovideruser", "data_provider_node"),
+    start_object_name="data_provider"
+)
+
+
+class GraphGenerator:
+    # synthetic graphs of the test_app models. every DataProvider has fan_out endpoints, and every TestModel3 is
+    # shared by fan_out TestModel2s, each shared by fan_out TestModel1s. TestModel1s are serialized up to the depth
+
+    def __init__(self, fan_out=10, depth=2, batch_size=1000):
+        self.fan_out = fan_out
+        self.depth = depth
+        self.batch_size = batch_size
+
+    def build_data_provider_payloads(self, count, prefix="provider") -> list:
+        return [self.build_data_provider_payload(f"{prefix}{index}") for index in range(count)]
+
+    def build_data_provider_payload(self, provider_name) -> dict:
+        return {
+            "provider_name": provider_name,
+            "api_endpoint": f"https://{provider_name}.example.com/api/",
+            "http_config": {
+                "header": {"User-Agent": "generic-serializer-benchmark", "Content-Type": "application/json"},
+                "url_encoded_params": {"format": "json"},
+            },
+            "oauth_config": {
+                "authorize_url": f"https://{provider_name}.example.com/oauth/authorize",
+                "access_token_url": f"https://{provider_name}.example.com/oauth/token",
+                "client_id": provider_name,
+                "client_secret": "secret",
+                "scope": ["read", "write"],
+            },
+            "endpoints": [
+                {"endpoint_name": f"endpoint{index}", "endpoint_url": f"/v1/endpoint{index}", "request_type": "GET"}
+                for index in range(self.fan_out)
+            ],
+        }
+
+    def create_data_providers(self, count, prefix="provider") -> list:
+        return DataProvider.deserialize_many(self.build_data_provider_payloads(count, prefix), DATA_PROVIDER_FILTER,
+                                             self.batch_size)
+
+    def create_test_model_graph(self, roots) -> list:
+        model3s = TestModel3._bulk_create([TestModel3(text=f"model3 {index}") for index in range(roots)],
+                                          self.batch_size, needs_pks=True)
+        model2s = TestModel2._bulk_create([TestModel2(text=f"model2 {index}", test_model3=parent)
+                                           for parent in model3s for index in range(self.fan_out)],
+                                          self.batch_size, needs_pks=True)
+        return TestModel1._bulk_create([TestModel1(text=f"model1 {index}", test_model2=parent)
+                                        for parent in model2s for index in range(self.fan_out)],
+                                       self.batch_size, needs_pks=False)
+
+    def get_test_model_filter(self) -> SerializableModelFilter:
+        return SerializableModelFilter(max_depth=self.depth, start_object_name="test_model1")
@@ -0,0 +1,152 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+import django
+
+BASELINES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+SCALES = {
+    "tiny": {"roots": 3, "fan_out": 2, "depth": 2},
+    "small": {"roots": 50, "fan_out": 10, "depth": 2},
+    "medium": {"roots": 100, "fan_out": 20, "depth": 2},
+}
+DEFAULT_REPEAT = 10
+# a case is reported as a regression when it is this much slower or uses this much more memory than its baseline
+DEFAULT_TOLERANCE = 0.5
+
+Measurement = namedtuple("Measurement", ["seconds", "queries", "peak_memory"])
+
+
+def measure(run, repeat=DEFAULT_REPEAT) -> Measurement:
+    # every run is rolled back, so writing cases can be repeated on the same data. the time is the best of the runs,
+    # the first of which also builds the serializers. memory is traced in a run of its own, as tracing slows it down
+    from django.db import connection, transaction
+    from django.test.utils import CaptureQueriesContext
+
+    seconds = []
+    for _ in range(repeat):
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            run()
+            seconds.append(time.perf_counter() - start)
+            transaction.set_rollback(True)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with transaction.atomic():
+            run()
+            transaction.set_rollback(True)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(min(seconds), len(queries), peak_memory)
+
+
+def build_cases(generator, roots) -> dict:
+    from benchmarks.graph_generator import DATA_PROVIDER_FILTER
+    from test_app.models import DataProvider, TestModel1
+
+    generator.create_data_providers(roots)
+    generator.create_test_model_graph(roots)
+    data_provider_pk = DataProvider.objects.order_by("pk").values_list("pk", flat=True).first()
+    payload = generator.build_data_provider_payload("new_provider")
+    payloads = generator.build_data_provider_payloads(roots, prefix="new_provider")
+    test_model_filter = generator.get_test_model_filter()
+    return {
+        # a fresh instance per run, the relations prefetched by a previous run would be reused otherwise
+        "serialize": lambda: DataProvider.objects.get(pk=data_provider_pk).serialize(DATA_PROVIDER_FILTER),
+        "serialize_queryset": lambda: DataProvider.serialize_queryset(DataProvider.objects.all(),
+                                                                      DATA_PROVIDER_FILTER),
+        "deserialize": lambda: DataProvider.deserialize(payload, DATA_PROVIDER_FILTER),
+        "deserialize_many": lambda: DataProvider.deserialize_many(payloads, DATA_PROVIDER_FILTER,
+                                                                  generator.batch_size),
+        "test_model_serialize_queryset": lambda: TestModel1.serialize_queryset(TestModel1.objects.all(),
+                                                                               test_model_filter),
+    }
+
+
+def run_suite(scale, repeat=DEFAULT_REPEAT, cases=None) -> dict:
+    # expects a migrated and empty database
+    from benchmarks.graph_generator import GraphGenerator
+
+    config = SCALES[scale]
+    generator = GraphGenerator(fan_out=config["fan_out"], depth=config["depth"])
+    results = {}
+    for name, run in build_cases(generator, config["roots"]).items():
+        if cases and name not in cases:
+            continue
+        results[name] = measure(run, repeat)._asdict()
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE) -> list:
+    # query counts don't depend on the machine, any increase is a regression
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["queries"] > expected["queries"]:
+            regressions.append(f"{name}: {result['queries']} queries, baseline {expected['queries']}")
+        for key in ("seconds", "peak_memory"):
+            if result[key] > expected[key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {result[key]:.6g}, baseline {expected[key]:.6g}")
+    return regressions
+
+
+def load_baselines() -> dict:
+    if not os.path.exists(BASELINES_FILE):
+        return {}
+    with open(BASELINES_FILE) as f:
+        return json.load(f)
+
+
+def save_baselines(baselines):
+    with open(BASELINES_FILE, "w") as f:
+        json.dump(baselines, f, indent=4, sort_keys=True)
+        f.write("\n")
+
+
+def print_results(results, baseline):
+    print(f"{'case':<32}{'seconds':>12}{'queries':>10}{'peak memory':>14}{'vs baseline':>14}")
+    for name, result in results.items():
+        expected = baseline.get(name)
+        ratio = f"{result['seconds'] / expected['seconds']:.2f}x" if expected and expected["seconds"] else "-"
+        print(f"{name:<32}{result['seconds']:>12.6f}{result['queries']:>10}{result['peak_memory']:>14}{ratio:>14}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="benchmarks of the generic serializer over the test_app models")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--case", action="append", dest="cases", help="only run this case, can be repeated")
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline of the scale")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    django.setup()
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+    baselines = load_baselines()
+    baseline = baselines.get(args.scale, {})
+    results = run_suite(args.scale, args.repeat, args.cases)
+    print_results(results, baseline)
+    if args.save:
+        baselines[args.scale] = {**baseline, **results}
+        save_baselines(baselines)
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
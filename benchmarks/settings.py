@@ -0,0 +1,11 @@
+from test_project.settings import *  # noqa: F401,F403
+
+# the benchmarks run against a local sqlite database, created and migrated by the runner
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get("BENCHMARK_DATABASE", ":memory:"),
+    }
+}
+
+DEBUG = False
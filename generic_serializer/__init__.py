@@ -1,2 +1,5 @@
 from .serializable_model import SerializableModel
 from .serializable_model_filter import SerializableModelFilter
+from .serializer_cache import serializer_cache
+from .output_cache import output_cache
+from .profiling import profile
@@ -0,0 +1,30 @@
+import asyncio
+import contextvars
+import functools
+
+from django.db import close_old_connections
+
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:
+    sync_to_async = None
+
+
+async def run_in_thread(func, *args, **kwargs):
+    # the orm of the supported django versions is synchronous, so a whole call is run in one worker thread, instead of
+    # a thread hop per object. concurrent calls run in threads of their own, asgiref's thread sensitive mode would run
+    # them one after another in a single shared thread. the context is copied, so an active profile() is kept
+    call = functools.partial(contextvars.copy_context().run, _run_with_connections, func, *args, **kwargs)
+    if sync_to_async is not None:
+        return await sync_to_async(call, thread_sensitive=False)()
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, call)
+
+
+def _run_with_connections(func, *args, **kwargs):
+    # executor threads are reused, their connections are handled as at the start and end of a request
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
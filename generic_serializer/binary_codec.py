@@ -0,0 +1,61 @@
+import logging
+from functools import lru_cache
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+logger = logging.getLogger(__name__)
+
+MSGPACK = "msgpack"
+CBOR = "cbor"
+
+
+class MsgpackCodec:
+    # strings are packed as str and bytes as bin, so a decoded tree holds the same types as the encoded one. msgpack
+    # integers are limited to 64 bits, larger ones are refused instead of being changed
+    name = MSGPACK
+
+    def dumps(self, json_obj) -> bytes:
+        try:
+            return msgpack.packb(json_obj, use_bin_type=True)
+        except OverflowError as e:
+            raise ValueError(f"could not encode as {self.name}: {e}")
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, use_list=True)
+
+
+class CborCodec:
+    # integers of any size are encoded as cbor bignums
+    name = CBOR
+
+    def dumps(self, json_obj) -> bytes:
+        return cbor2.dumps(json_obj)
+
+    def loads(self, data):
+        return cbor2.loads(data)
+
+
+BINARY_CODECS = {
+    MSGPACK: (MsgpackCodec, msgpack),
+    CBOR: (CborCodec, cbor2),
+}
+
+
+@lru_cache(maxsize=None)
+def get_binary_codec(name):
+    try:
+        Codec, module = BINARY_CODECS[name]
+    except KeyError:
+        raise ValueError(f"unknown binary codec: {name}, expected one of {', '.join(BINARY_CODECS)}")
+    if module is None:
+        raise ImportError(f"binary codec {name} is not installed")
+    logger.debug(f"using binary codec: {name}")
+    return Codec()
@@ -0,0 +1,92 @@
+import logging
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+from django.core.signals import setting_changed
+from django.db.models import TextField, IntegerField, FloatField, BooleanField, ForeignKey, OneToOneField, ManyToOneRel, \
+    OneToOneRel
+from django.db.models.signals import class_prepared
+from jsonfield import JSONField
+
+from .native_model_serializer import NativeJSONField
+
+logger = logging.getLogger(__name__)
+
+many_to_one_relation_types = (ForeignKey, ManyToOneRel)
+one_to_one_relation_types = (OneToOneField, OneToOneRel)
+relation_types = many_to_one_relation_types + one_to_one_relation_types
+many_relation_types = (ManyToOneRel,)
+attribute_types = (TextField, IntegerField, FloatField, BooleanField, JSONField)
+CUSTOM_FIELDS = {JSONField: NativeJSONField, }
+
+RelationInfo = namedtuple("RelationInfo", [
+    "name",
+    "many",
+    # forward relations are concrete foreign keys on the model itself, reverse relations live on the related model
+    "forward",
+    "related_model",
+    # attname of the foreign key column, only for forward relations
+    "attname",
+    # name of the foreign key on the related model, only for reverse relations
+    "reverse_field_name",
+    # name of the relation on the related model that points back at this model
+    "remote_name",
+    # reverse relations without related_name are only reachable as "<name>_set"
+    "accessible",
+])
+
+FieldIndex = namedtuple("FieldIndex", [
+    "attribute_names",
+    "attribute_name_set",
+    "custom_fields",
+    "relation_names",
+    "relation_name_set",
+    "relations",
+])
+
+
+@lru_cache(maxsize=None)
+def get_field_index(model) -> FieldIndex:
+    logger.debug(f"building field index for {model.__name__}")
+    fields = model._meta.get_fields()
+    attribute_names = tuple(field.name for field in fields if isinstance(field, attribute_types))
+    custom_fields = tuple((field.name, SerializerField) for ModelField, SerializerField in CUSTOM_FIELDS.items()
+                          for field in fields if isinstance(field, ModelField))
+    relations = {field.name: _build_relation_info(model, field) for field in fields if isinstance(field, relation_types)}
+    return FieldIndex(
+        attribute_names=attribute_names,
+        attribute_name_set=frozenset(attribute_names),
+        custom_fields=custom_fields,
+        relation_names=tuple(relations),
+        relation_name_set=frozenset(relations),
+        relations=MappingProxyType(relations),
+    )
+
+
+def _build_relation_info(model, field) -> RelationInfo:
+    forward = field.concrete
+    return RelationInfo(
+        name=field.name,
+        many=type(field) in many_relation_types,
+        forward=forward,
+        related_model=field.related_model,
+        attname=field.attname if forward else None,
+        reverse_field_name=None if forward else field.field.name,
+        remote_name=field.remote_field.name if forward else field.field.name,
+        accessible=hasattr(model, field.name),
+    )
+
+
+def clear_field_index(**kwargs):
+    get_field_index.cache_clear()
+
+
+def _clear_on_installed_apps_changed(setting, **kwargs):
+    if setting == "INSTALLED_APPS":
+        clear_field_index()
+
+
+# models that are (re)registered, and changes to the installed apps, can change the relations of existing models
+class_prepared.connect(clear_field_index, dispatch_uid="generic_serializer_field_index_class_prepared")
+setting_changed.connect(_clear_on_installed_apps_changed, dispatch_uid="generic_serializer_field_index_setting")
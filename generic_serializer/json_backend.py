@@ -0,0 +1,112 @@
+import json
+import logging
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+logger = logging.getLogger(__name__)
+
+JSON_BACKEND_SETTING = "GENERIC_SERIALIZER_JSON_BACKEND"
+AUTO = "auto"
+STDLIB = "stdlib"
+ORJSON = "orjson"
+UJSON = "ujson"
+ENCODING = "utf-8"
+INDENT = 4
+
+
+class StdlibJsonBackend:
+    name = STDLIB
+    compact_separators = (",", ":")
+
+    def dumps(self, json_obj, pretty=False) -> str:
+        if pretty:
+            return json.dumps(json_obj, indent=INDENT)
+        return json.dumps(json_obj, separators=self.compact_separators)
+
+    def dumps_bytes(self, json_obj, pretty=False) -> bytes:
+        return self.dumps(json_obj, pretty).encode(ENCODING)
+
+    def loads(self, text):
+        return json.loads(text)
+
+
+class OrjsonJsonBackend:
+    # orjson only supports an indent of 2, and serializes straight to utf-8 bytes
+    name = ORJSON
+
+    def dumps(self, json_obj, pretty=False) -> str:
+        return self.dumps_bytes(json_obj, pretty).decode(ENCODING)
+
+    def dumps_bytes(self, json_obj, pretty=False) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(json_obj, option=option)
+
+    def loads(self, text):
+        return orjson.loads(text)
+
+
+class UjsonJsonBackend:
+    name = UJSON
+
+    def dumps(self, json_obj, pretty=False) -> str:
+        if pretty:
+            return ujson.dumps(json_obj, indent=INDENT)
+        return ujson.dumps(json_obj)
+
+    def dumps_bytes(self, json_obj, pretty=False) -> bytes:
+        return self.dumps(json_obj, pretty).encode(ENCODING)
+
+    def loads(self, text):
+        return ujson.loads(text)
+
+
+JSON_BACKENDS = {
+    STDLIB: (StdlibJsonBackend, json),
+    ORJSON: (OrjsonJsonBackend, orjson),
+    UJSON: (UjsonJsonBackend, ujson),
+}
+# the order in which installed backends are picked when the setting is "auto"
+AUTO_PREFERENCE = (ORJSON, UJSON, STDLIB)
+
+
+@lru_cache(maxsize=None)
+def get_json_backend(name=None):
+    name = name or _get_configured_backend_name()
+    if name == AUTO:
+        name = next(name for name in AUTO_PREFERENCE if JSON_BACKENDS[name][1] is not None)
+    try:
+        Backend, module = JSON_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown json backend: {name}, expected one of {AUTO}, {', '.join(JSON_BACKENDS)}")
+    if module is None:
+        raise ImportError(f"json backend {name} is not installed")
+    logger.debug(f"using json backend: {name}")
+    return Backend()
+
+
+def _get_configured_backend_name():
+    if not settings.configured:
+        return AUTO
+    return getattr(settings, JSON_BACKEND_SETTING, AUTO)
+
+
+def _clear_on_json_backend_changed(setting, **kwargs):
+    if setting == JSON_BACKEND_SETTING:
+        get_json_backend.cache_clear()
+
+
+setting_changed.connect(_clear_on_json_backend_changed, dispatch_uid="generic_serializer_json_backend_setting")
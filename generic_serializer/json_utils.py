@@ -1,45 +1,174 @@
+import codecs
 import hashlib
 import json
-from typing import Union
+import re
+from typing import Union, Iterable, Iterator, TextIO
+
+from .json_backend import get_json_backend
 
 JsonType = Union[dict, list]
 JsonTypeInstance = (dict, list)
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# the rest of a buffer that a number decoded from it might still continue into
+NUMBER_TAIL = re.compile(r"[0-9.eE+\-]*\Z")
 
 
 class JsonUtils:
     encoding = "utf-8"
+    read_size = 1 << 16
+    hash_digest_size = 16
+
+    @staticmethod
+    def get_backend():
+        # picked from the GENERIC_SERIALIZER_JSON_BACKEND setting, by default the fastest installed backend
+        return get_json_backend()
 
     @classmethod
     def read_json_file(cls, filename):
-        with open(filename, encoding=cls.encoding) as f:
-            return cls.validate(f.read())
+        with open(filename, "rb") as f:
+            return cls.loads(f.read())
 
     @classmethod
-    def validate(cls, data: Union[str, JsonType]) -> JsonType:
+    def iter_json_file(cls, filename, ndjson=False) -> Iterator[JsonType]:
+        with open(filename, "rb") as f:
+            yield from cls.iter_ndjson(f) if ndjson else cls.iter_json_array(f)
+
+    @classmethod
+    def iter_ndjson(cls, stream) -> Iterator[JsonType]:
+        # one document per line, from text or binary files as well as mmaps
+        line = stream.readline()
+        while line:
+            if line.strip():
+                yield cls.loads(line)
+            line = stream.readline()
+
+    @classmethod
+    def iter_json_array(cls, stream) -> Iterator[JsonType]:
+        # yields the elements of a top level array one at a time, only the element being parsed and the current read
+        # are held in memory
+        buffer = _StreamBuffer(stream, cls.encoding, cls.read_size)
+        if buffer.next_char() != "[":
+            raise ValueError("expected a json array")
+        buffer.pos += 1
+        if buffer.next_char() == "]":
+            return
+        while True:
+            yield buffer.decode_value()
+            char = buffer.next_char()
+            buffer.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"expected ',' or ']' in json array, got: {char or 'end of file'}")
+
+    @classmethod
+    def validate(cls, data: Union[str, bytes, JsonType]) -> JsonType:
         if isinstance(data, JsonTypeInstance):
-            data = json.dumps(data)
-        return json.loads(data, encoding=cls.encoding)
+            data = cls.get_backend().dumps_bytes(data)
+        return cls.get_backend().loads(data)
 
     @classmethod
-    def loads(cls, text: str) -> JsonType:
-        return json.loads(text, encoding=cls.encoding)
+    def loads(cls, text: Union[str, bytes]) -> JsonType:
+        return cls.get_backend().loads(text)
 
     @classmethod
-    def clean(cls, text: str) -> str:
-        json_obj = json.loads(text, encoding=cls.encoding)
-        return json.dumps(json_obj, indent=4)
+    def clean(cls, text: Union[str, bytes], pretty=True) -> str:
+        return cls.dumps(cls.loads(text), pretty)
 
-    @staticmethod
-    def dumps(json_obj: JsonType) -> str:
-        return json.dumps(json_obj, indent=4)
+    @classmethod
+    def dumps(cls, json_obj: JsonType, pretty=True) -> str:
+        return cls.get_backend().dumps(json_obj, pretty)
 
-    @staticmethod
-    def hash(text: str) -> str:
-        return hashlib.sha1(text)
+    @classmethod
+    def dumps_compact(cls, json_obj: JsonType) -> str:
+        return cls.dumps(json_obj, pretty=False)
+
+    @classmethod
+    def dumps_bytes(cls, json_obj: JsonType, pretty=False) -> bytes:
+        return cls.get_backend().dumps_bytes(json_obj, pretty)
+
+    @classmethod
+    def write_ndjson(cls, stream: TextIO, json_objs: Iterable[JsonType]) -> int:
+        count = 0
+        for json_obj in json_objs:
+            stream.write(cls.dumps_compact(json_obj))
+            stream.write("\n")
+            count += 1
+        return count
+
+    @classmethod
+    def write_json_array(cls, stream: TextIO, json_objs: Iterable[JsonType]) -> int:
+        count = 0
+        stream.write("[")
+        for json_obj in json_objs:
+            if count:
+                stream.write(",")
+            stream.write(cls.dumps_compact(json_obj))
+            count += 1
+        stream.write("]")
+        return count
+
+    @classmethod
+    def canonical_dumps(cls, json_obj: JsonType) -> bytes:
+        # sorted keys, compact, and floats in their shortest round tripping form. always the stdlib encoder, so
+        # fingerprints don't change with the configured json backend
+        return json.dumps(json_obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+                          allow_nan=False).encode(cls.encoding)
 
     @classmethod
-    def dump_and_hash(cls, json_obj: JsonType):
-        return cls.hash(cls.dumps(json_obj))
+    def hash(cls, data: Union[str, bytes]) -> str:
+        if isinstance(data, str):
+            data = data.encode(cls.encoding)
+        return hashlib.blake2b(data, digest_size=cls.hash_digest_size).hexdigest()
+
+    @classmethod
+    def fingerprint(cls, json_obj: JsonType) -> str:
+        return cls._fingerprint(json_obj, (), None)
+
+    @classmethod
+    def subtree_fingerprints(cls, json_obj: JsonType) -> dict:
+        # fingerprint of every dict and list in the tree, keyed by its path of keys and list indexes. containers are
+        # hashed over the fingerprints of their children, so an unchanged subtree keeps its fingerprint wherever it
+        # is in the tree, and the root fingerprint is the same as fingerprint()
+        fingerprints = {}
+        cls._fingerprint(json_obj, (), fingerprints)
+        return fingerprints
+
+    @classmethod
+    def _fingerprint(cls, json_obj, path: tuple, fingerprints) -> str:
+        if isinstance(json_obj, dict):
+            children = sorted(json_obj.items())
+        elif isinstance(json_obj, list):
+            children = list(enumerate(json_obj))
+        else:
+            return cls.hash(cls.canonical_dumps(json_obj))
+        if any(isinstance(value, JsonTypeInstance) for _, value in children):
+            data = cls._canonical_container(json_obj, children, path, fingerprints)
+        else:
+            # the canonical dump of a container without containers in it is the same as the one built from its parts
+            data = cls.canonical_dumps(json_obj)
+        fingerprint = cls.hash(data)
+        if fingerprints is not None:
+            fingerprints[path] = fingerprint
+        return fingerprint
+
+    @classmethod
+    def _canonical_container(cls, json_obj, children, path, fingerprints) -> bytes:
+        parts = []
+        for key, value in children:
+            if isinstance(value, JsonTypeInstance):
+                # "#" can't start a json value, so a fingerprint can't be mistaken for a value
+                part = b"#" + cls._fingerprint(value, path + (key,), fingerprints).encode(cls.encoding)
+            else:
+                part = cls.canonical_dumps(value)
+            parts.append(cls.canonical_dumps(key) + b":" + part if isinstance(json_obj, dict) else part)
+        if isinstance(json_obj, dict):
+            return b"{" + b",".join(parts) + b"}"
+        return b"[" + b",".join(parts) + b"]"
+
+    @classmethod
+    def dump_and_hash(cls, json_obj: JsonType) -> str:
+        return cls.fingerprint(json_obj)
 
     @classmethod
     def dump_and_load(cls, text):
@@ -52,8 +181,61 @@ class JsonUtils:
         else:
             return cls.dict_to_set_of_tuple(json_obj)
 
-    @staticmethod
-    def dict_to_set_of_tuple(dicti: dict):
+    @classmethod
+    def dict_to_set_of_tuple(cls, dicti: dict):
         if not isinstance(dicti, dict):
             raise Exception("expected dict")
-        return {(key, value) for key, value in dicti.items()}
+        # nested values are not hashable, they are compared by their canonical dump
+        return {(key, cls.canonical_dumps(value) if isinstance(value, JsonTypeInstance) else value)
+                for key, value in dicti.items()}
+
+
+class _StreamBuffer:
+    def __init__(self, stream, encoding, read_size):
+        self.stream = stream
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.json_decoder = json.JSONDecoder()
+        self.read_size = read_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=0) -> bool:
+        # drops the consumed text, so the buffer never grows beyond the unparsed part and one read
+        if self.eof:
+            return False
+        chunk = self.stream.read(max(size, self.read_size))
+        if isinstance(chunk, (bytes, bytearray)):
+            chunk = self.decoder.decode(chunk, final=not chunk)
+        self.eof = not chunk
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return not self.eof
+
+    def next_char(self) -> str:
+        while True:
+            self.pos = WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def decode_value(self):
+        self.next_char()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.text, self.pos)
+                # a number followed by nothing but number characters, such as "12345." at the end of the buffer,
+                # might continue in the next read
+                if self.eof or not self._is_number(value) or not NUMBER_TAIL.match(self.text, end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # values larger than a read are retried with reads that double the buffer, to keep parsing linear
+            self.fill(len(self.text) - self.pos)
+
+    @staticmethod
+    def _is_number(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
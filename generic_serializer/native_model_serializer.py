@@ -0,0 +1,75 @@
+from rest_framework.fields import SkipField, JSONField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.serializers import ModelSerializer
+from rest_framework.validators import UniqueValidator, UniqueTogetherValidator
+
+from .profiling import get_active_profile
+
+UPSERT = "upsert"
+
+
+def to_plain_json(value):
+    # json fields can load objects as OrderedDicts, through the load_kwargs of the model field
+    if isinstance(value, dict):
+        return {key: to_plain_json(item) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [to_plain_json(item) for item in value]
+    return value
+
+
+class NativeJSONField(JSONField):
+
+    def to_representation(self, value):
+        return to_plain_json(super().to_representation(value))
+
+
+class NativeModelSerializer(ModelSerializer):
+    # same as drf's Serializer.to_representation, but builds plain dicts instead of OrderedDicts, and resolves the
+    # readable fields only once per serializer, as nested serializers are reused for every related object
+
+    def to_representation(self, instance) -> dict:
+        profile = get_active_profile()
+        if profile is not None:
+            profile.count_node(self.Meta.model, self._get_depth())
+        ret = {}
+        for field in self._get_native_readable_fields():
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            if check_for_none is None:
+                ret[field.field_name] = None
+            else:
+                ret[field.field_name] = field.to_representation(attribute)
+        return ret
+
+    def _get_native_readable_fields(self) -> list:
+        try:
+            return self._native_readable_fields
+        except AttributeError:
+            self._native_readable_fields = list(self._readable_fields)
+            return self._native_readable_fields
+
+    def _get_depth(self) -> int:
+        # serializers built from a plan know their path, any other one is counted as a root
+        plan = getattr(self, "plan", None)
+        return len(plan.path) if plan is not None else 0
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.context.get(UPSERT):
+            # existing rows are matched on their natural key when upserting, so it may not be unique checked
+            for name in self.Meta.model._get_natural_key_fields():
+                if name in fields:
+                    fields[name].validators = [validator for validator in fields[name].validators
+                                               if not isinstance(validator, UniqueValidator)]
+        return fields
+
+    def get_validators(self):
+        validators = super().get_validators()
+        if self.context.get(UPSERT):
+            natural_key_fields = set(self.Meta.model._get_natural_key_fields())
+            validators = [validator for validator in validators if not (
+                isinstance(validator, UniqueTogetherValidator) and set(validator.fields) <= natural_key_fields)]
+        return validators
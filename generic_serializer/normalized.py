@@ -0,0 +1,122 @@
+from collections import defaultdict
+
+from django.core.exceptions import ObjectDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+from .field_index import get_field_index
+from .native_model_serializer import UPSERT
+
+DATA = "data"
+INCLUDED = "included"
+
+
+def get_flat_plan(plan):
+    # the plan of an object without its relations, which are rendered as references instead
+    return plan._replace(relations=(), select_related_paths=(), prefetch_related_paths=())
+
+
+def get_label(model) -> str:
+    return model._meta.label_lower
+
+
+class Normalizer:
+    # renders every object reached through a plan once, into a map per model label keyed by primary key. relations
+    # are rendered as the primary keys of the related objects, so the output grows with the number of distinct
+    # objects instead of the number of paths to them
+
+    def __init__(self):
+        self.included = defaultdict(dict)
+        self.rendered = set()
+        self.serializers = {}
+
+    def add(self, instance, plan):
+        ref = instance.pk
+        key = (plan, ref)
+        if key in self.rendered:
+            return ref
+        self.rendered.add(key)
+        # an object reached through plans with different fields gets the union of their fields
+        entry = self.included[get_label(plan.model)].setdefault(str(ref), {})
+        entry.update(self._get_serializer(plan).to_representation(instance))
+        relations = get_field_index(plan.model).relations
+        for relation in plan.relations:
+            if not relations[relation.name].accessible:
+                continue
+            if relation.many:
+                entry[relation.name] = [self.add(related, relation.plan)
+                                        for related in getattr(instance, relation.name).all()]
+                continue
+            try:
+                related = getattr(instance, relation.name)
+            except ObjectDoesNotExist:
+                related = None
+            entry[relation.name] = None if related is None else self.add(related, relation.plan)
+        return ref
+
+    def _get_serializer(self, plan):
+        try:
+            return self.serializers[plan]
+        except KeyError:
+            Serializer = plan.model._get_serializer_for_plan(get_flat_plan(plan))
+            serializer = self.serializers[plan] = Serializer()
+            return serializer
+
+    def get_document(self, data) -> dict:
+        return {DATA: data, INCLUDED: {label: dict(objects) for label, objects in self.included.items()}}
+
+
+class NormalizedReader:
+    # resolves the references of a normalized document into write nodes. an object referenced from several places
+    # is validated and written once, and every object pointing at it points at the same row
+
+    def __init__(self, document, planner):
+        try:
+            self.included = document[INCLUDED]
+        except (KeyError, TypeError):
+            raise ValidationError(f"a normalized document needs an {INCLUDED} map")
+        self.planner = planner
+        self.nodes = {}
+        self.visited = set()
+        self.links = set()
+
+    def add(self, plan, ref):
+        label = get_label(plan.model)
+        ref = str(ref)
+        node = self.nodes.get((label, ref))
+        if (plan, ref) in self.visited:
+            return node
+        self.visited.add((plan, ref))
+        try:
+            entry = self.included[label][ref]
+        except KeyError:
+            raise ValidationError(f"could not resolve the reference to {label} {ref}")
+        Serializer = plan.model._get_serializer_for_plan(get_flat_plan(plan))
+        serializer = Serializer(data=entry, context={UPSERT: self.planner.upsert})
+        if not plan.model._is_valid(serializer):
+            raise ValidationError(f"could not deserialize {label} {ref}, due to error: {serializer.errors}")
+        properties = plan.model._get_properties_from_data(serializer.validated_data)
+        if node is None:
+            node = self.nodes[(label, ref)] = self.planner.add_object(plan.model, properties, len(plan.path))
+        else:
+            for name, value in properties.items():
+                setattr(node.instance, name, value)
+            node.field_names += [name for name in properties if name not in node.field_names]
+        self._add_relations(node, plan, entry)
+        return node
+
+    def _add_relations(self, node, plan, entry):
+        relations = get_field_index(plan.model).relations
+        for relation_plan in plan.relations:
+            value = entry.get(relation_plan.name)
+            if value is None:
+                continue
+            refs = value if relation_plan.many else [value]
+            if not isinstance(refs, list):
+                raise ValidationError(f"expected a list of references for {relation_plan.name}")
+            relation = relations[relation_plan.name]
+            for related_ref in refs:
+                related_node = self.add(relation_plan.plan, related_ref)
+                link = (id(node), relation.name, id(related_node))
+                if link not in self.links:
+                    self.links.add(link)
+                    self.planner.add_relation(node, relation, related_node)
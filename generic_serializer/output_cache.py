@@ -0,0 +1,188 @@
+import logging
+import uuid
+from collections import defaultdict
+from functools import lru_cache
+
+from django.apps import apps
+from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete, class_prepared
+
+from .field_index import get_field_index
+from .json_utils import JsonUtils
+from .serializable_model_filter import SerializableModelFilter
+from .serialization_plan import LOOKUP_SEP
+
+logger = logging.getLogger(__name__)
+
+PENDING_ROOTS_ATTRIBUTE = "_output_cache_pending_roots"
+
+
+class OutputCache:
+    # caches serialized trees of models with cache_serialized_output set, in a django cache. every root object has
+    # a version key that is part of the keys of its trees, so invalidating all its trees is a single write. the root
+    # model has one as well, for invalidating the trees of all its objects
+    KEY_PREFIX = "generic_serializer"
+    DEFAULT_TIMEOUT = 3600
+
+    def __init__(self, alias=DEFAULT_CACHE_ALIAS, timeout=DEFAULT_TIMEOUT):
+        self.alias = alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get_or_serialize(self, instance, filter: SerializableModelFilter, serialize):
+        model = type(instance)
+        version_key = self._get_version_key(model, instance.pk)
+        version, model_version = self._get_versions([version_key, self._get_model_version_key(model)])
+        key = f"{version_key}:{version}:{model_version}:{JsonUtils.hash(repr(filter.signature()))}"
+        data = self.cache.get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+        self.misses += 1
+        data = serialize()
+        self.cache.set(key, data, self.timeout)
+        return data
+
+    def invalidate(self, model, pks=None):
+        # without primary keys, the trees of every object of the model are invalidated
+        if pks is None:
+            logger.debug(f"invalidating all cached trees of {model.__name__}")
+            self.cache.set(self._get_model_version_key(model), uuid.uuid4().hex, None)
+            self.invalidations += 1
+            return
+        if not pks:
+            return
+        logger.debug(f"invalidating {len(pks)} cached trees of {model.__name__}")
+        self.cache.set_many({self._get_version_key(model, pk): uuid.uuid4().hex for pk in pks}, None)
+        self.invalidations += len(pks)
+
+    def invalidate_related(self, model, pks):
+        # invalidates the trees of every cached root that contains one of the objects. to be called after writes
+        # that don't send signals, such as bulk writes and queryset updates
+        for root_model, root_pks in self.get_related_roots(model, pks).items():
+            self.invalidate(root_model, root_pks)
+
+    def get_related_roots(self, model, pks) -> dict:
+        # the primary keys of the roots by root model, or None when all trees of the root model can contain the objects
+        roots = {}
+        for root_model, lookup in get_output_cache_dependencies().get(model, ()):
+            if lookup is None:
+                roots[root_model] = None
+                continue
+            if root_model in roots and roots[root_model] is None:
+                continue
+            if not lookup:
+                roots.setdefault(root_model, set()).update(pks)
+                continue
+            roots.setdefault(root_model, set()).update(root_model._default_manager.filter(
+                **{lookup + LOOKUP_SEP + "pk__in": list(pks)}).values_list("pk", flat=True))
+        return roots
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _get_versions(self, keys) -> list:
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # versions are never reused, so a version key that was evicted can't bring back an outdated tree
+                version = uuid.uuid4().hex
+                if not self.cache.add(key, version, None):
+                    version = self.cache.get(key, version)
+                versions[key] = version
+        return [versions[key] for key in keys]
+
+    def _get_version_key(self, model, pk) -> str:
+        return f"{self.KEY_PREFIX}:{model._meta.label_lower}:{pk}"
+
+    def _get_model_version_key(self, model) -> str:
+        return f"{self.KEY_PREFIX}:{model._meta.label_lower}"
+
+
+@lru_cache(maxsize=None)
+def get_output_cache_dependencies() -> dict:
+    # for every model, the cached root models whose trees can contain it, and the lookup from the root to it. taken
+    # from the relations an unfiltered plan of the root follows, which contain the relations of any filter. the
+    # lookup is None when the model can be nested at any depth, below a cycle of relations
+    dependencies = defaultdict(list)
+    for root_model in apps.get_models():
+        if not getattr(root_model, "cache_serialized_output", False):
+            continue
+        reachable, cyclic = [], set()
+        _collect_reachable_models(root_model, (), (), None, reachable, cyclic)
+        for model, path, models in reachable:
+            dependency = (root_model, None if cyclic.intersection(models) else LOOKUP_SEP.join(path))
+            if dependency not in dependencies[model]:
+                dependencies[model].append(dependency)
+    return dict(dependencies)
+
+
+def _collect_reachable_models(model, path, models, back_reference, reachable, cyclic):
+    # every model reachable from the root, with the relation path to it and the models on that path. a relation back
+    # to a model on the path is not followed, the models from there on are part of a cycle and a serializer can
+    # nest them as deep as its max depth
+    models = models + (model,)
+    reachable.append((model, path, models))
+    for relation in get_field_index(model).relations.values():
+        if relation.name == back_reference:
+            continue
+        if relation.related_model in models:
+            cyclic.update(models[models.index(relation.related_model):])
+            continue
+        _collect_reachable_models(relation.related_model, path + (relation.name,), models, relation.remote_name,
+                                  reachable, cyclic)
+
+
+def clear_output_cache_dependencies(**kwargs):
+    get_output_cache_dependencies.cache_clear()
+
+
+def _invalidate_on_save(sender, instance, **kwargs):
+    if sender in get_output_cache_dependencies():
+        _invalidate_now_and_on_commit(output_cache.get_related_roots(sender, [instance.pk]), kwargs.get("using"))
+
+
+def _collect_roots_before_delete(sender, instance, **kwargs):
+    # the roots can't be looked up through the object once it is deleted
+    if sender in get_output_cache_dependencies():
+        setattr(instance, PENDING_ROOTS_ATTRIBUTE, output_cache.get_related_roots(sender, [instance.pk]))
+
+
+def _invalidate_on_delete(sender, instance, **kwargs):
+    roots = getattr(instance, PENDING_ROOTS_ATTRIBUTE, None)
+    if roots:
+        _invalidate_now_and_on_commit(roots, kwargs.get("using"))
+
+
+def _invalidate_now_and_on_commit(roots, using=None):
+    # now, so the writing transaction reads its own changes, and again on commit, since other connections can have
+    # cached the committed trees in the meantime
+    def invalidate():
+        for root_model, pks in roots.items():
+            output_cache.invalidate(root_model, pks)
+
+    invalidate()
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(invalidate, using)
+
+
+output_cache = OutputCache()
+
+class_prepared.connect(clear_output_cache_dependencies, dispatch_uid="generic_serializer_output_cache_class_prepared")
+post_save.connect(_invalidate_on_save, dispatch_uid="generic_serializer_output_cache_post_save")
+pre_delete.connect(_collect_roots_before_delete, dispatch_uid="generic_serializer_output_cache_pre_delete")
+post_delete.connect(_invalidate_on_delete, dispatch_uid="generic_serializer_output_cache_post_delete")
@@ -0,0 +1,98 @@
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+from .json_utils import JsonUtils
+
+logger = logging.getLogger(__name__)
+
+SHARD_NAME = "{name}-{index:05d}.ndjson"
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def get_pk_ranges(queryset, partitions) -> list:
+    # the boundaries are taken at every n-th primary key, so every partition holds about as many roots, even when
+    # the primary keys have gaps. the primary keys are read in a single pass instead of a query with an offset per
+    # boundary. the last range is open ended
+    pks = queryset.order_by("pk").values_list("pk", flat=True)
+    count = pks.count()
+    if not count:
+        return []
+    size = math.ceil(count / partitions)
+    starts = list(islice(pks.iterator(), 0, None, size))
+    return list(zip(starts, starts[1:] + [None]))
+
+
+def export_shards(model, queryset, directory, filter, workers=None, partitions=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE) -> list:
+    # serializes every primary key range into its own ndjson shard, in a pool of worker processes that each open
+    # their own database connection. returns the (path, count) of every shard, in primary key order
+    workers = workers or os.cpu_count()
+    tasks = [(model._meta.label, queryset.db, queryset.query, pk_range, filter, chunk_size,
+              os.path.join(directory, SHARD_NAME.format(name=model._meta.model_name, index=index)))
+             for index, pk_range in enumerate(get_pk_ranges(queryset, partitions or workers))]
+    logger.debug(f"exporting {len(tasks)} partitions of {model.__name__} with {workers} workers")
+    if workers == 1:
+        return [_export_partition(*task) for task in tasks]
+    # spawned workers don't inherit the connections and threads of this process
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=_setup_worker,
+                             initargs=(queryset.db, connections[queryset.db].settings_dict)) as executor:
+        return list(executor.map(_export_partition, *zip(*tasks)))
+
+
+def _setup_worker(using, settings_dict):
+    # the workers connect to the database the queryset was read from, such as a test database, instead of the one
+    # the settings name
+    settings.DATABASES[using] = dict(settings_dict)
+    django.setup()
+
+
+def _export_partition(model_label, using, query, pk_range, filter, chunk_size, path) -> tuple:
+    model = apps.get_model(model_label)
+    queryset = model._default_manager.db_manager(using).all()
+    queryset.query = query
+    start, end = pk_range
+    queryset = queryset.filter(pk__gte=start)
+    if end is not None:
+        queryset = queryset.filter(pk__lt=end)
+    with open(path, "w", encoding=JsonUtils.encoding) as f:
+        count = model.export_ndjson(queryset.order_by("pk"), f, filter, chunk_size)
+    return path, count
+
+
+def merge_shards(shards, stream, ndjson=True) -> int:
+    # one shard is read at a time, ndjson shards are copied as they are
+    count = 0
+    if not ndjson:
+        stream.write("[")
+    for path, shard_count in shards:
+        with open(path, encoding=JsonUtils.encoding) as f:
+            if ndjson:
+                shutil.copyfileobj(f, stream)
+                count += shard_count
+                continue
+            for line in f:
+                if count:
+                    stream.write(",")
+                stream.write(line.rstrip("\n"))
+                count += 1
+    if not ndjson:
+        stream.write("]")
+    return count
+
+
+def export_parallel(model, queryset, stream, filter, workers=None, partitions=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                    ndjson=True) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        shards = export_shards(model, queryset, directory, filter, workers, partitions, chunk_size)
+        return merge_shards(shards, stream, ndjson)
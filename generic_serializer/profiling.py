@@ -0,0 +1,83 @@
+import time
+from collections import defaultdict, Counter
+from contextlib import contextmanager, ExitStack
+from contextvars import ContextVar
+
+from django.db import connections
+
+PHASE_BUILD = "build"
+PHASE_FETCH = "fetch"
+PHASE_RENDER = "render"
+PHASE_ENCODE = "encode"
+PHASE_DECODE = "decode"
+PHASE_VALIDATE = "validate"
+PHASE_WRITE = "write"
+
+_active_profile = ContextVar("generic_serializer_profile", default=None)
+
+
+class Profile:
+    # what the serialize and deserialize calls made inside a profile() block spent their time on. phases are summed
+    # over the calls, nodes are counted per model label and depth below the starting object
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.phases = defaultdict(float)
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.nodes = defaultdict(Counter)
+
+    def count_node(self, model, depth, count=1):
+        self.nodes[model._meta.label_lower][depth] += count
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_seconds += time.perf_counter() - start
+
+    def as_dict(self) -> dict:
+        return {
+            "seconds": self.seconds,
+            "phases": dict(self.phases),
+            "queries": {"count": self.query_count, "seconds": self.query_seconds},
+            "nodes": {label: dict(sorted(depths.items())) for label, depths in self.nodes.items()},
+            "node_count": sum(sum(depths.values()) for depths in self.nodes.values()),
+        }
+
+
+@contextmanager
+def profile(callback=None):
+    # queries are counted on the connections of the current thread. the callback gets the report as a dict
+    report = Profile()
+    token = _active_profile.set(report)
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(report.execute_wrapper))
+            yield report
+    finally:
+        report.seconds = time.perf_counter() - start
+        _active_profile.reset(token)
+        if callback is not None:
+            callback(report.as_dict())
+
+
+def get_active_profile():
+    return _active_profile.get()
+
+
+@contextmanager
+def phase(name):
+    report = _active_profile.get()
+    if report is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        report.phases[name] += time.perf_counter() - start
@@ -1,164 +1,473 @@
+import copy
 import logging
+from itertools import islice
 
-from django.db.models import TextField, IntegerField, FloatField, BooleanField, ForeignKey, OneToOneField, ManyToOneRel, \
-    OneToOneRel
-from django.db.models.fields.related_descriptors import ReverseOneToOneDescriptor, ReverseManyToOneDescriptor
-from jsonfield import JSONField
+from django.db import connections, router
+from django.db.models import prefetch_related_objects, Max, Q
 from rest_framework.exceptions import ValidationError
-from rest_framework.serializers import ModelSerializer, JSONField as JSONSerializerField
 
 from generic_serializer.json_utils import JsonUtils
+from .async_utils import run_in_thread
+from .binary_codec import get_binary_codec, BINARY_CODECS, MSGPACK, CBOR
+from .field_index import get_field_index
+from .native_model_serializer import NativeModelSerializer, UPSERT
+from .normalized import Normalizer, NormalizedReader, DATA
+from .output_cache import output_cache
+from .profiling import phase, get_active_profile, PHASE_BUILD, PHASE_FETCH, PHASE_RENDER, PHASE_ENCODE, \
+    PHASE_DECODE, PHASE_VALIDATE, PHASE_WRITE
+from . import parallel_export, table_export
+from .parallel_export import DEFAULT_CHUNK_SIZE
 from .serializable_model_filter import SerializableModelFilter
+from .serialization_plan import SerializationPlan, RelationPlan, LOOKUP_SEP
+from .serializer_cache import serializer_cache
+from .tree_diff import get_identity_keys, get_relation_paths, apply_patch, get_changed_subtrees
+from .write_planner import WritePlanner, DEFAULT_BATCH_SIZE
 
 logger = logging.getLogger(__name__)
 
 MODEL = "model"
 META = "Meta"
 FIELDS = "fields"
-
-many_to_one_relation_types = (ForeignKey, ManyToOneRel)
-one_to_one_relation_types = (OneToOneField, OneToOneRel)
-relation_types = many_to_one_relation_types + one_to_one_relation_types
-attribute_types = (TextField, IntegerField, FloatField, BooleanField, JSONField)
-CUSTOM_FIELDS = {JSONField: JSONSerializerField, }
+PLAN = "plan"
+SELECT_RELATED_PATHS = "select_related_paths"
+PREFETCH_RELATED_PATHS = "prefetch_related_paths"
+OUTPUT_NATIVE = "native"
+OUTPUT_JSON_STR = "json_str"
+OUTPUT_JSON_BYTES = "json_bytes"
+OUTPUT_MSGPACK = MSGPACK
+OUTPUT_CBOR = CBOR
+INPUT_NATIVE = "native"
+# json text, either str or bytes
+INPUT_JSON = "json"
+INPUT_MSGPACK = MSGPACK
+INPUT_CBOR = CBOR
 default_filter = SerializableModelFilter()
 
 
 class SerializableModel:
+    natural_key_fields = None
+    # serialized trees are kept in the output cache, and invalidated when an object in them is saved or deleted
+    cache_serialized_output = False
+    # a field that increases on every write, such as an auto_now timestamp or a version counter, used by delta exports
+    watermark_field = None
+
     def get_model_name(self):
         return self._meta.model_name
 
-    def serialize(self, filter: SerializableModelFilter = default_filter):
-        if not filter.current_object_name:
-            # TODO ._meta.model_name is not the correct property. fix.
-            logger.debug(f"using default model name as starting name: {self.get_model_name()}")
-            filter.current_object_name = self.get_model_name()
-        Serializer = type(self)._build_serializer(filter)
-        serializer = Serializer(self)
-        return JsonUtils.validate(serializer.data)
+    def serialize(self, filter: SerializableModelFilter = default_filter, output=OUTPUT_NATIVE):
+        if self.cache_serialized_output:
+            data = output_cache.get_or_serialize(self, filter, lambda: self._serialize_native(filter))
+        else:
+            data = self._serialize_native(filter)
+        return type(self)._encode_output(data, output)
+
+    def _serialize_native(self, filter: SerializableModelFilter) -> dict:
+        with phase(PHASE_BUILD):
+            Serializer = type(self)._get_serializer(filter)
+        with phase(PHASE_FETCH):
+            instance = self._copy_without_related_caches()
+            type(self)._prefetch_instances([instance], Serializer)
+        with phase(PHASE_RENDER):
+            return Serializer(instance).to_representation(instance)
+
+    def _copy_without_related_caches(self):
+        # relations are prefetched onto a copy, so this instance doesn't keep serving them after they have changed.
+        # the field values are shared, unsaved changes are still serialized
+        instance = copy.copy(self)
+        instance._state = copy.copy(self._state)
+        instance._state.fields_cache = {}
+        instance.__dict__.pop("_prefetched_objects_cache", None)
+        return instance
+
+    async def aserialize(self, filter: SerializableModelFilter = default_filter, output=OUTPUT_NATIVE):
+        return await run_in_thread(self.serialize, filter, output)
+
+    def fingerprint(self, filter: SerializableModelFilter = default_filter) -> str:
+        # canonical hash of the serialized object, usable as an etag or to detect an unchanged graph
+        return JsonUtils.fingerprint(self.serialize(filter))
+
+    @classmethod
+    def serialize_queryset(cls, queryset, filter: SerializableModelFilter = default_filter, output=OUTPUT_NATIVE):
+        with phase(PHASE_BUILD):
+            Serializer = cls._get_serializer(filter)
+        with phase(PHASE_FETCH):
+            # evaluated before rendering, so fetching and rendering are timed apart
+            instances = list(cls._apply_related_paths(queryset, Serializer))
+        with phase(PHASE_RENDER):
+            data = Serializer(many=True).to_representation(instances)
+        return cls._encode_output(data, output)
+
+    @classmethod
+    async def aserialize_queryset(cls, queryset, filter: SerializableModelFilter = default_filter,
+                                  output=OUTPUT_NATIVE):
+        return await run_in_thread(cls.serialize_queryset, queryset, filter, output)
+
+    @staticmethod
+    def _encode_output(data, output):
+        # the serializer already renders plain dicts and lists, so the data is encoded at most once
+        if output == OUTPUT_NATIVE:
+            return data
+        with phase(PHASE_ENCODE):
+            if output == OUTPUT_JSON_STR:
+                return JsonUtils.dumps_compact(data)
+            elif output == OUTPUT_JSON_BYTES:
+                return JsonUtils.dumps_bytes(data)
+            elif output in BINARY_CODECS:
+                return get_binary_codec(output).dumps(data)
+        raise ValueError(f"unknown output mode: {output}")
+
+    @staticmethod
+    def _decode_input(data, input):
+        if input == INPUT_NATIVE:
+            return data
+        with phase(PHASE_DECODE):
+            if input == INPUT_JSON:
+                return JsonUtils.loads(data)
+            elif input in BINARY_CODECS:
+                return get_binary_codec(input).loads(data)
+        raise ValueError(f"unknown input mode: {input}")
+
+    def serialize_normalized(self, filter: SerializableModelFilter = default_filter, output=OUTPUT_NATIVE):
+        # every object once in the included map of its model, relations and data hold primary keys
+        with phase(PHASE_BUILD):
+            Serializer = type(self)._get_serializer(filter)
+        with phase(PHASE_FETCH):
+            instance = self._copy_without_related_caches()
+            type(self)._prefetch_instances([instance], Serializer)
+        with phase(PHASE_RENDER):
+            normalizer = Normalizer()
+            document = normalizer.get_document(normalizer.add(instance, Serializer.plan))
+        return type(self)._encode_output(document, output)
+
+    @classmethod
+    def serialize_queryset_normalized(cls, queryset, filter: SerializableModelFilter = default_filter,
+                                      output=OUTPUT_NATIVE):
+        with phase(PHASE_BUILD):
+            Serializer = cls._get_serializer(filter)
+        with phase(PHASE_FETCH):
+            instances = list(cls._apply_related_paths(queryset, Serializer))
+        with phase(PHASE_RENDER):
+            normalizer = Normalizer()
+            document = normalizer.get_document([normalizer.add(instance, Serializer.plan) for instance in instances])
+        return cls._encode_output(document, output)
+
+    @classmethod
+    def iter_serialize_queryset(cls, queryset, filter: SerializableModelFilter = default_filter,
+                                chunk_size=DEFAULT_CHUNK_SIZE):
+        # iterator() ignores prefetch_related, so the relations are prefetched per chunk instead. this keeps the
+        # number of loaded objects bounded by the chunk size
+        with phase(PHASE_BUILD):
+            Serializer = cls._get_serializer(filter)
+        queryset = queryset.select_related(*Serializer.select_related_paths)
+        for chunk in cls._iter_chunks(queryset.iterator(chunk_size=chunk_size), chunk_size):
+            with phase(PHASE_FETCH):
+                prefetch_related_objects(chunk, *Serializer.prefetch_related_paths)
+            with phase(PHASE_RENDER):
+                data = Serializer(many=True).to_representation(chunk)
+            yield from data
+
+    @classmethod
+    def export_changed_since(cls, watermark, filter: SerializableModelFilter = default_filter, queryset=None) -> tuple:
+        queryset, new_watermark = cls.get_changed_since(watermark, filter, queryset)
+        return cls.serialize_queryset(queryset.order_by("pk"), filter), new_watermark
+
+    @classmethod
+    def get_changed_since(cls, watermark, filter: SerializableModelFilter = default_filter, queryset=None) -> tuple:
+        # the roots whose own row, or a row anywhere in their tree, has a watermark field above the watermark, which
+        # maps model labels to the highest value seen in the previous export. None selects every root. the new
+        # watermark is read before the changes, so rows written in between are exported again rather than missed
+        queryset = cls._default_manager.all() if queryset is None else queryset
+        tracked = [plan for plan in cls._get_plan(filter).iter_plans() if getattr(plan.model, "watermark_field", None)]
+        if not tracked:
+            raise ValueError(f"no model in the tree of {cls.__name__} has a watermark_field")
+        new_watermark = cls._get_new_watermark(tracked, watermark or {})
+        if watermark is None:
+            return queryset, new_watermark
+        condition = Q(pk__in=[])
+        for plan in tracked:
+            condition |= Q(pk__in=cls._default_manager.filter(
+                cls._get_changed_condition(plan, watermark.get(plan.model._meta.label_lower))).values("pk"))
+        return queryset.filter(condition), new_watermark
+
+    @staticmethod
+    def _get_new_watermark(tracked, watermark: dict) -> dict:
+        new_watermark = {}
+        for model in {plan.model for plan in tracked}:
+            label = model._meta.label_lower
+            highest = model._default_manager.aggregate(highest=Max(model.watermark_field))["highest"]
+            new_watermark[label] = highest if highest is not None else watermark.get(label)
+        return new_watermark
+
+    @staticmethod
+    def _get_changed_condition(plan, value) -> Q:
+        # models without a previous watermark count as changed wherever they are in the tree
+        if value is None:
+            return Q(**{LOOKUP_SEP.join(plan.path) + LOOKUP_SEP + "isnull": False}) if plan.path else Q()
+        return Q(**{LOOKUP_SEP.join(plan.path + (plan.model.watermark_field, "gt")): value})
+
+    @classmethod
+    def export_ndjson(cls, queryset, stream, filter: SerializableModelFilter = default_filter,
+                      chunk_size=DEFAULT_CHUNK_SIZE) -> int:
+        return JsonUtils.write_ndjson(stream, cls.iter_serialize_queryset(queryset, filter, chunk_size))
+
+    @classmethod
+    def export_json_array(cls, queryset, stream, filter: SerializableModelFilter = default_filter,
+                          chunk_size=DEFAULT_CHUNK_SIZE) -> int:
+        return JsonUtils.write_json_array(stream, cls.iter_serialize_queryset(queryset, filter, chunk_size))
+
+    @classmethod
+    def export_parallel(cls, queryset, stream, filter: SerializableModelFilter = default_filter, workers=None,
+                        partitions=None, chunk_size=DEFAULT_CHUNK_SIZE, ndjson=True) -> int:
+        # the roots are written in primary key order
+        return parallel_export.export_parallel(cls, queryset, stream, filter, workers, partitions, chunk_size, ndjson)
+
+    @classmethod
+    def export_shards(cls, queryset, directory, filter: SerializableModelFilter = default_filter, workers=None,
+                      partitions=None, chunk_size=DEFAULT_CHUNK_SIZE) -> list:
+        return parallel_export.export_shards(cls, queryset, directory, filter, workers, partitions, chunk_size)
 
     @classmethod
-    def deserialize(cls, data, filter: SerializableModelFilter):
-        deserialized_object = cls._deserialize_to_objects(data, filter)
+    def export_tables(cls, queryset, directory, filter: SerializableModelFilter = default_filter,
+                      format=table_export.CSV, chunk_size=DEFAULT_CHUNK_SIZE) -> dict:
+        # a flat table per path of the plan, for analytics. returns the (path, row count) of every table by its name
+        return table_export.export_tables(cls._get_plan(filter), queryset, directory, format, chunk_size)
+
+    @staticmethod
+    def _iter_chunks(iterable, chunk_size):
+        iterator = iter(iterable)
+        chunk = list(islice(iterator, chunk_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(iterator, chunk_size))
+
+    @classmethod
+    def deserialize(cls, data, filter: SerializableModelFilter, upsert=False, input=INPUT_NATIVE):
+        deserialized_object = cls._deserialize_to_objects(cls._decode_input(data, input), filter, upsert)
         return deserialized_object
 
     @classmethod
-    def _deserialize_to_objects(cls, data, filter: SerializableModelFilter):
-        # This is not so nice, should maybe be refactored. It is in order to be able to only create the related
-        # objects serializers that actually should be serialized
-        filter.data = data
-        Serializer = cls._build_serializer(filter)
-        serializer = Serializer(data=data)
-        if not serializer.is_valid():
+    async def adeserialize(cls, data, filter: SerializableModelFilter, upsert=False, input=INPUT_NATIVE):
+        return await run_in_thread(cls.deserialize, data, filter, upsert, input)
+
+    @classmethod
+    def deserialize_many(cls, data: list, filter: SerializableModelFilter, batch_size=DEFAULT_BATCH_SIZE,
+                         upsert=False, input=INPUT_NATIVE) -> list:
+        data = cls._decode_input(data, input)
+        Serializer = cls._get_serializer_for_data(filter, data)
+        serializer = Serializer(data=data, many=True, context={UPSERT: upsert})
+        if not cls._is_valid(serializer):
             raise ValidationError(f"could not deserialize, due to error: {serializer.errors}")
-        serialized_object = serializer.save()
-        return serialized_object
+        return cls._write_validated_data(serializer.validated_data, batch_size, upsert)
 
     @classmethod
-    def _build_serializer(cls, filter: SerializableModelFilter):
-        properties = cls._build_properties(filter)
-        serializer = type(cls.__name__ + "Serializer", (ModelSerializer,), properties)
-        return serializer
+    def deserialize_normalized(cls, document: dict, filter: SerializableModelFilter, batch_size=DEFAULT_BATCH_SIZE,
+                               upsert=False, input=INPUT_NATIVE):
+        # writes every object reachable from data once, returns the instance or the list of instances data refers to
+        document = cls._decode_input(document, input)
+        planner = WritePlanner(batch_size, upsert)
+        reader = NormalizedReader(document, planner)
+        data = document.get(DATA)
+        plan = cls._get_plan(filter)
+        roots = [reader.add(plan, ref) for ref in (data if isinstance(data, list) else [data])]
+        for root in roots:
+            root.needs_pk = True
+        with phase(PHASE_WRITE):
+            cls._execute_planner(planner)
+        instances = [root.instance for root in roots]
+        return instances if isinstance(data, list) else instances[0]
 
     @classmethod
-    def _build_properties(cls, filter: SerializableModelFilter) -> dict:
-        # each property must contain the serializer class for any related object so it is here the recursive filtering
-        # is handled
-        properties = {META: cls._build_meta_class(filter)}
-        custom_field_properties = cls._build_custom_field_properties(filter)
-        properties.update(custom_field_properties)
-        properties = cls._add_relations_to_properties(properties, filter)
-        properties = cls._add_create_method_to_properties(properties)
-        return properties
+    def deserialize_patch(cls, data: list, patch: list, filter: SerializableModelFilter,
+                          batch_size=DEFAULT_BATCH_SIZE) -> list:
+        # upserts the trees the patch changes in data, a list of serialized trees. only the changed relations and
+        # list elements are validated and written, removed elements are not deleted
+        plan = cls._get_plan(filter)
+        identity_keys = get_identity_keys(plan)
+        changed = get_changed_subtrees(apply_patch(data, patch, identity_keys), patch, identity_keys,
+                                       get_relation_paths(plan))
+        if not changed:
+            return []
+        return cls.deserialize_many(changed, filter, batch_size, upsert=True)
 
     @classmethod
-    def _build_relation_serializers(cls, relation_names, filter) -> dict:
-        return {name: cls._try_build_relation_serializer_instance(name, filter) for name in relation_names}
+    def import_ndjson(cls, stream, filter: SerializableModelFilter, batch_size=DEFAULT_BATCH_SIZE, upsert=False) -> int:
+        return cls._deserialize_in_batches(JsonUtils.iter_ndjson(stream), filter, batch_size, upsert)
 
     @classmethod
-    def _try_build_relation_serializer_instance(cls, relation_name, filter):
-        filter.step_into(relation_name)
-        related_object = cls._get_related_object_by_property_name(relation_name)
-        try:
-            Serializer = related_object._build_serializer(filter)
-        except Exception as e:
-            logger.warning(f"could not create related serializer object with name: {relation_name}")
-        else:
-            return Serializer(many=cls._is_related_object_many(relation_name), required=False)
-        finally:
-            filter.step_out()
+    def import_json_array(cls, stream, filter: SerializableModelFilter, batch_size=DEFAULT_BATCH_SIZE,
+                          upsert=False) -> int:
+        return cls._deserialize_in_batches(JsonUtils.iter_json_array(stream), filter, batch_size, upsert)
 
     @classmethod
-    def _is_related_object_many(cls, property_name):
-        return type(cls._meta.get_field(property_name)) in many_to_one_relation_types
+    def _deserialize_in_batches(cls, json_objs, filter: SerializableModelFilter, batch_size, upsert) -> int:
+        # every batch is validated and written in its own transaction, so only one batch of the input is in memory
+        count = 0
+        for batch in cls._iter_chunks(json_objs, batch_size):
+            cls.deserialize_many(batch, filter, batch_size, upsert)
+            count += len(batch)
+        return count
 
     @classmethod
-    def _get_related_object_by_property_name(cls, property_name):
-        return cls._meta.get_field(property_name).related_model
+    def _write_validated_data(cls, validated_data: list, batch_size=DEFAULT_BATCH_SIZE, upsert=False) -> list:
+        with phase(PHASE_WRITE):
+            planner = WritePlanner(batch_size, upsert)
+            nodes = [planner.add(cls, validated_data_element) for validated_data_element in validated_data]
+            cls._execute_planner(planner)
+        return [node.instance for node in nodes]
+
+    @staticmethod
+    def _execute_planner(planner: WritePlanner):
+        planner.execute()
+        if planner.upsert:
+            # bulk writes don't send signals. without upsert only new trees are written, which can't be cached yet
+            for model, pks in planner.get_written_pks().items():
+                output_cache.invalidate_related(model, pks)
+        profile = get_active_profile()
+        if profile is not None:
+            for node in planner.nodes:
+                profile.count_node(node.model, node.depth)
+
+    @staticmethod
+    def _is_valid(serializer) -> bool:
+        with phase(PHASE_VALIDATE):
+            return serializer.is_valid()
 
     @classmethod
-    def _build_meta_class(cls, filter):
-        meta_properties = {
-            MODEL: cls,
-            FIELDS: cls._get_all_attribute_names(filter)
-        }
-        return type(META, (), meta_properties)
+    def _get_natural_key_fields(cls) -> tuple:
+        # the fields existing rows are matched on when upserting, either configured on the model or its first
+        # unique field
+        if cls.natural_key_fields is not None:
+            return tuple(cls.natural_key_fields)
+        unique_fields = [field.name for field in cls._meta.concrete_fields if field.unique and not field.primary_key]
+        if unique_fields:
+            return unique_fields[0],
+        if cls._meta.unique_together:
+            return tuple(cls._meta.unique_together[0])
+        return ()
 
     @classmethod
-    def _get_all_model_relations_names(cls, filter: SerializableModelFilter) -> list:
-        names = cls._get_all_field_names_of_type(relation_types)
-        names = filter.apply_relation_filter(names)
-        return names
+    def _bulk_create(cls, instances: list, batch_size, needs_pks: bool):
+        connection = connections[router.db_for_write(cls)]
+        if not needs_pks or cls._can_return_pks_from_bulk_insert(connection):
+            # django before 3.0 doesn't cap the batch size at what the backend supports, such as sqlite's 500 rows
+            max_batch_size = max(connection.ops.bulk_batch_size(cls._meta.concrete_fields, instances), 1)
+            return cls.objects.bulk_create(instances, batch_size=min(batch_size or max_batch_size, max_batch_size))
+        # the backend does not report the primary keys of bulk inserted rows, which the children need
+        for instance in instances:
+            instance.save(force_insert=True)
+        return instances
+
+    @staticmethod
+    def _can_return_pks_from_bulk_insert(connection) -> bool:
+        # the feature flag was renamed in django 3.0
+        return getattr(connection.features, "can_return_rows_from_bulk_insert",
+                       getattr(connection.features, "can_return_ids_from_bulk_insert", False))
 
     @classmethod
-    def _get_all_attribute_names(cls, filter):
-        names = cls._get_all_field_names_of_type(attribute_types)
-        return filter.apply_property_filter(names)
+    def _deserialize_to_objects(cls, data, filter: SerializableModelFilter, upsert=False):
+        Serializer = cls._get_serializer_for_data(filter, data)
+        serializer = Serializer(data=data, context={UPSERT: upsert})
+        if not cls._is_valid(serializer):
+            raise ValidationError(f"could not deserialize, due to error: {serializer.errors}")
+        deserialized_object, = cls._write_validated_data([serializer.validated_data], upsert=upsert)
+        return deserialized_object
 
     @classmethod
-    def _get_all_field_names_of_type(cls, types) -> list:
-        return [field.name for field in cls._meta.get_fields() if isinstance(field, types)]
+    def _get_serializer(cls, filter: SerializableModelFilter):
+        key = (cls, filter.signature())
+        return serializer_cache.get_or_build(key, lambda: cls._build_serializer(filter))
 
     @classmethod
-    def _add_relations_to_properties(cls, properties, filter: SerializableModelFilter):
-        relation_names = cls._get_all_model_relations_names(filter)
-        properties[META].fields += relation_names
-        properties.update(cls._build_relation_serializers(relation_names, filter))
-        return properties
+    def optimize_queryset(cls, queryset, filter: SerializableModelFilter):
+        Serializer = cls._get_serializer(filter)
+        return cls._apply_related_paths(queryset, Serializer)
+
+    @staticmethod
+    def _apply_related_paths(queryset, Serializer):
+        return queryset.select_related(*Serializer.select_related_paths) \
+            .prefetch_related(*Serializer.prefetch_related_paths)
+
+    @staticmethod
+    def _prefetch_instances(instances, Serializer):
+        # select_related can not be applied to already fetched instances, so every path is prefetched instead
+        paths = Serializer.select_related_paths + Serializer.prefetch_related_paths
+        if paths:
+            prefetch_related_objects(instances, *paths)
+
+    @classmethod
+    def _get_serializer_for_data(cls, filter: SerializableModelFilter, data):
+        # only the relations present in the payload get a serializer, equal payload shapes share one
+        with phase(PHASE_BUILD):
+            return cls._get_serializer_for_plan(cls._get_plan(filter).prune_to_data(data))
 
     @classmethod
-    def _build_custom_field_properties(cls, filter):
+    def _get_serializer_for_plan(cls, plan: SerializationPlan):
+        return serializer_cache.get_or_build((cls, plan), lambda: cls._build_serializer_from_plan(plan))
+
+    @classmethod
+    def _get_plan(cls, filter: SerializableModelFilter) -> SerializationPlan:
+        return cls._get_serializer(filter).plan
+
+    @classmethod
+    def _build_serializer(cls, filter: SerializableModelFilter):
+        return cls._build_serializer_from_plan(SerializationPlan.compile(cls, filter))
+
+    @classmethod
+    def _build_properties(cls, filter: SerializableModelFilter) -> dict:
+        return cls._build_plan_properties(SerializationPlan.compile(cls, filter))
+
+    @classmethod
+    def _build_serializer_from_plan(cls, plan: SerializationPlan):
+        properties = cls._build_plan_properties(plan)
+        serializer = type(cls.__name__ + "Serializer", (NativeModelSerializer,), properties)
+        return serializer
+
+    @classmethod
+    def _build_plan_properties(cls, plan: SerializationPlan) -> dict:
+        # each property must contain the serializer class for any related object, the plan already holds the result
+        # of the recursive filtering
+        properties = {
+            META: cls._build_meta_class(plan),
+            PLAN: plan,
+            SELECT_RELATED_PATHS: plan.select_related_paths,
+            PREFETCH_RELATED_PATHS: plan.prefetch_related_paths,
+        }
         # custom filed properties is need for custom fields such as JSONField, that is not build in DRF
-        custom_field_properties = {}
-        for ModelField, SerializerField in CUSTOM_FIELDS.items():
-            names = cls._get_all_field_names_of_type(ModelField)
-            names = filter.apply_property_filter(names)
-            custom_field_properties.update({name: SerializerField() for name in names})
-        return custom_field_properties
+        properties.update({name: SerializerField() for name, SerializerField in plan.custom_fields})
+        properties.update(cls._build_relation_serializers(plan))
+        properties = cls._add_create_method_to_properties(properties)
+        return properties
 
     @classmethod
-    def create(cls, validated_data):
-        properties = cls._get_properties_from_data(validated_data)
-        base_instance = cls.objects.create(**properties)
-        cls._create_related_objects(base_instance, validated_data)
-        return base_instance
+    def _build_relation_serializers(cls, plan: SerializationPlan) -> dict:
+        return {relation.name: cls._try_build_relation_serializer_instance(relation) for relation in plan.relations}
+
+    @classmethod
+    def _try_build_relation_serializer_instance(cls, relation: RelationPlan):
+        try:
+            Serializer = relation.plan.model._build_serializer_from_plan(relation.plan)
+        except Exception as e:
+            logger.warning(f"could not create related serializer object with name: {relation.name}")
+        else:
+            return Serializer(many=relation.many, required=False)
+
+    @classmethod
+    def _is_related_object_many(cls, property_name):
+        # only reverse foreign keys hold many objects, a forward foreign key points at a single object
+        return get_field_index(cls).relations[property_name].many
 
     @classmethod
-    def _create_related_objects(cls, base_instance, validated_data):
-        relations = cls._get_relations_from_data(validated_data)
-        for relation_name, relation_data in relations.items():
-            relation_object = cls._get_relation_object(relation_name)
-            parrent_data = cls._create_parrent_data(base_instance, relation_name)
-            if not cls._is_related_object_many(relation_name):
-                relation_data = [relation_data]
-            for relation_data_element in relation_data:
-                relation_object.objects.create(**relation_data_element, **parrent_data)
+    def _build_meta_class(cls, plan: SerializationPlan):
+        meta_properties = {
+            MODEL: cls,
+            FIELDS: list(plan.fields) + list(plan.relation_names)
+        }
+        return type(META, (), meta_properties)
 
     @classmethod
-    def _create_parrent_data(cls, base_instance, relation_name):
-        to_parrent_related_name = cls._get_related_name(relation_name)
-        parrent_info = {to_parrent_related_name: base_instance}
-        return parrent_info
+    def create(cls, validated_data):
+        base_instance, = cls._write_validated_data([validated_data])
+        return base_instance
 
     @classmethod
     def _add_create_method_to_properties(cls, properties):
@@ -167,32 +476,10 @@ class SerializableModel:
 
     @classmethod
     def _get_properties_from_data(cls, data):
-        names = cls._get_all_field_names_of_type(attribute_types)
+        names = get_field_index(cls).attribute_name_set
         return {name: val for name, val in data.items() if name in names}
 
     @classmethod
     def _get_relations_from_data(cls, data) -> dict:
-        names = cls._get_all_field_names_of_type(relation_types)
+        names = get_field_index(cls).relation_name_set
         return {name: val for name, val in data.items() if name in names}
-
-    @classmethod
-    def _get_relation_object(cls, relation_name):
-        return cls._get_related_field(relation_name).model
-
-    @classmethod
-    def _get_related_name(cls, relation_name):
-        return cls._get_related_field(relation_name).name
-
-    @classmethod
-    def _get_related_field(cls, relation_name):
-        related_object = getattr(cls, relation_name)
-        # if isinstance(related_object, (OneToOneRel, ManyToOneRel)):
-        #     return related_object.related.field
-        # elif isinstance(related_object, (OneToOneField, ForeignKey)):
-        #     return related_object.field
-        if isinstance(related_object, (ReverseOneToOneDescriptor,)):
-            return related_object.related.field
-        elif isinstance(related_object, (ReverseManyToOneDescriptor,)):
-            return related_object.field
-        else:
-            raise AttributeError(f"unknown relation type: {type(related_object)}")
@@ -2,22 +2,80 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+PATH_SEP = "."
+
 
 class SerializableModelFilter:
+    # immutable configuration, the state of a traversal is kept in a SerializableModelFilterContext per call, so a
+    # filter can be shared between threads and coroutines
     DEPTH_INFINITE = 999999
 
-    def __init__(self, max_depth=DEPTH_INFINITE, exclude_labels=(), start_object_name=None):
+    def __init__(self, max_depth=DEPTH_INFINITE, exclude_labels=(), start_object_name=None, include_paths=()):
+        # exclude labels without dots apply at every depth, dotted labels such as "endpoints.endpoint_url" only at
+        # that path from the starting object. include paths restrict the relations that are walked to the ones on
+        # the way to, or below, one of the paths
+        if start_object_name is None:
+            logger.warning("starting object has not been set which could lead to issues")
+        self._max_depth = max_depth
+        self._exclude_labels = tuple(exclude_labels)
+        self._start_object_name = start_object_name
+        self._include_paths = tuple(include_paths)
+        self._label_excludes = frozenset(label for label in self._exclude_labels if PATH_SEP not in label)
+        self._path_excludes = frozenset(label for label in self._exclude_labels if PATH_SEP in label)
+
+    @property
+    def max_depth(self):
+        return self._max_depth
+
+    @property
+    def exclude_labels(self) -> tuple:
+        return self._exclude_labels
+
+    @property
+    def start_object_name(self):
+        return self._start_object_name
+
+    @property
+    def include_paths(self) -> tuple:
+        return self._include_paths
+
+    def is_excluded(self, path: str, label: str) -> bool:
+        return label in self._label_excludes or path in self._path_excludes
+
+    def is_included(self, path: str) -> bool:
+        if not self._include_paths:
+            return True
+        return any(include_path == path or include_path.startswith(path + PATH_SEP)
+                   or path.startswith(include_path + PATH_SEP) for include_path in self._include_paths)
+
+    def signature(self) -> tuple:
+        # hashable identity of the configuration, used to key the serializer cache
+        return self.max_depth, tuple(sorted(set(self.exclude_labels))), self.start_object_name, \
+            tuple(sorted(set(self.include_paths)))
+
+    def start(self, start_object_name=None) -> "SerializableModelFilterContext":
+        return SerializableModelFilterContext(self, start_object_name or self.start_object_name)
+
+    @classmethod
+    def adjust_depth(cls, depth):
+        if depth == cls.DEPTH_INFINITE:
+            return depth
+        else:
+            return depth - 1 if depth > 0 else 0
+
+
+class SerializableModelFilterContext:
+    def __init__(self, filter: SerializableModelFilter, start_object_name):
+        self.filter = filter
+        self.max_depth = filter.max_depth
+        self.exclude_labels = filter.exclude_labels
         self.current_depth = 0
         self.ancestors = []
         self.parrent_object_name = None
         self.current_object_name = start_object_name
-        if self.current_object_name is None:
-            logger.warning("starting object has not been set which could lead to issues")
-        self.max_depth = max_depth
-        self.exclude_labels = exclude_labels
-        # this is all in order to be able to validate if related objects exists in data,
-        # if not they will be excluded
-        self.data = dict()
+        # relation names walked from the starting object, and the names of the relations pointing back at the parent
+        self.path = []
+        self.back_references = []
 
     def apply_property_filter(self, labels: list) -> list:
         labels = self.remove_exclude_labels(labels)
@@ -27,8 +85,9 @@ class SerializableModelFilter:
         if self.is_max_depth_reached():
             return []
         labels = self.remove_parrent_object(labels)
+        labels = self.remove_back_reference(labels)
         labels = self.remove_exclude_labels(labels)
-        # labels = self.remove_if_not_exists_in_data(labels)
+        labels = self.remove_not_included(labels)
         return labels
 
     def is_max_depth_reached(self):
@@ -41,63 +100,38 @@ class SerializableModelFilter:
             pass
         return labels
 
+    def remove_back_reference(self, labels: list):
+        if not self.back_references or self.back_references[-1] is None:
+            return labels
+        return [label for label in labels if label != self.back_references[-1]]
+
     def remove_exclude_labels(self, labels):
-        labels = list(set(labels) - set(self.exclude_labels))
-        return labels
+        return [label for label in labels if not self.filter.is_excluded(self.get_path(label), label)]
 
-    def remove_if_not_exists_in_data(self, labels: list):
-        if self.data == {}:  # if we are serializing data will not be set and we should therefore not exclude
-            return labels
-        if not len(labels):  # if it is already empty dont bother to check if it is in the data.
-            return []
-        existing_object_names = self.get_existing_object_names()
-        labels = [label for label in labels if label in existing_object_names]
-        return labels
+    def remove_not_included(self, labels):
+        return [label for label in labels if self.filter.is_included(self.get_path(label))]
 
-    def get_existing_object_names(self):
-        loc = self.get_to_current_data_location()
-        if isinstance(loc, list):
-            return self.get_union_set_of_object_names_in_list(loc)
-        return list(loc.keys())
-
-    def get_to_current_data_location(self):
-        if self.current_depth == 0:
-            return self.data
-        elif self.current_depth == 1:
-            return self.data.get(self.current_object_name)
-        else:
-            current_loc = self.data
-            for ancestor in self.ancestors:
-                current_loc.get(ancestor)
-            return current_loc.get(self.parrent_object_name)
+    def get_path(self, label) -> str:
+        return PATH_SEP.join(self.path + [label])
 
-    def step_into(self, object_name):
+    def step_into(self, object_name, back_reference=None):
         logger.debug(f"adding serializer {object_name}")
         self.ancestors.append(self.parrent_object_name)
         self.parrent_object_name = self.current_object_name
         self.current_object_name = object_name
+        self.path.append(object_name)
+        self.back_references.append(back_reference)
         self.current_depth += 1
         self.validate_depth()
 
     def step_out(self):
         self.current_object_name = self.parrent_object_name
         self.parrent_object_name = self.ancestors.pop()
+        self.path.pop()
+        self.back_references.pop()
         self.current_depth -= 1
         self.validate_depth()
 
     def validate_depth(self):
         if self.current_depth > self.max_depth:
             raise StopIteration("Something is wrong. current depth should not exceed max dept")
-
-    @classmethod
-    def adjust_depth(cls, depth):
-        if depth == cls.DEPTH_INFINITE:
-            return depth
-        else:
-            return depth - 1 if depth > 0 else 0
-
-    def get_union_set_of_object_names_in_list(self, loc):
-        union_set = []
-        for obj in loc:
-            union_set += list(obj.keys())
-        return list(set(union_set))
@@ -0,0 +1,110 @@
+import logging
+from collections import namedtuple
+
+from .field_index import get_field_index
+from .serializable_model_filter import SerializableModelFilter, SerializableModelFilterContext
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_SEP = "__"
+
+RelationPlan = namedtuple("RelationPlan", ["name", "many", "plan"])
+
+
+class SerializationPlan(namedtuple("SerializationPlan", [
+    "model",
+    # relation names from the starting object to this model
+    "path",
+    "fields",
+    "custom_fields",
+    "relations",
+    "select_related_paths",
+    "prefetch_related_paths",
+])):
+    # immutable and hashable result of applying a filter to a model and every model related to it. serializers are
+    # built from the plan without looking at the filter again, and equal plans can share a serializer
+
+    @classmethod
+    def compile(cls, model, filter: SerializableModelFilter) -> "SerializationPlan":
+        start_object_name = filter.start_object_name
+        if not start_object_name:
+            # TODO ._meta.model_name is not the correct property. fix.
+            logger.debug(f"using default model name as starting name: {model._meta.model_name}")
+            start_object_name = model._meta.model_name
+        return cls._compile(model, filter.start(start_object_name))
+
+    @classmethod
+    def _compile(cls, model, context: SerializableModelFilterContext) -> "SerializationPlan":
+        index = get_field_index(model)
+        fields = tuple(context.apply_property_filter(list(index.attribute_names)))
+        custom_fields = tuple((name, SerializerField) for name, SerializerField in index.custom_fields
+                              if name in fields)
+        relations = []
+        for name in context.apply_relation_filter(list(index.relation_names)):
+            relation = index.relations[name]
+            context.step_into(name, relation.remote_name)
+            try:
+                relations.append(RelationPlan(name, relation.many, cls._compile(relation.related_model, context)))
+            finally:
+                context.step_out()
+        select_related, prefetch_related = cls._build_related_paths(index, relations)
+        return cls(model, tuple(context.path), fields, custom_fields, tuple(relations), select_related,
+                   prefetch_related)
+
+    @staticmethod
+    def _build_related_paths(index, relations) -> tuple:
+        # single valued relations are joined with select_related for as long as the chain stays single valued,
+        # everything below a many relation has to be prefetched
+        select_related, prefetch_related = [], []
+        for relation in relations:
+            # reverse relations without a related_name are reached through "<name>_set", drf skips those fields
+            if not index.relations[relation.name].accessible:
+                continue
+            name = relation.name
+            child_select = [name + LOOKUP_SEP + path for path in relation.plan.select_related_paths]
+            child_prefetch = [name + LOOKUP_SEP + path for path in relation.plan.prefetch_related_paths]
+            if relation.many:
+                prefetch_related += [name] + child_select + child_prefetch
+            else:
+                select_related += [name] + child_select
+                prefetch_related += child_prefetch
+        return tuple(select_related), tuple(prefetch_related)
+
+    def prune_to_data(self, data) -> "SerializationPlan":
+        # keeps only the relations whose key is present in the payload, for a list of payloads the union of their
+        # keys, so deserialization only builds and validates the serializers the payload actually uses
+        elements = [element for element in (data if isinstance(data, list) else [data]) if isinstance(element, dict)]
+        relations = []
+        for relation in self.relations:
+            present = [element[relation.name] for element in elements if relation.name in element]
+            if not present:
+                continue
+            related_data = []
+            for value in present:
+                if isinstance(value, list):
+                    related_data += value
+                elif value is not None:
+                    related_data.append(value)
+            relations.append(relation._replace(plan=relation.plan.prune_to_data(related_data)))
+        if len(relations) == len(self.relations) and all(
+                pruned.plan is relation.plan for pruned, relation in zip(relations, self.relations)):
+            return self
+        select_related, prefetch_related = self._build_related_paths(get_field_index(self.model), relations)
+        return self._replace(relations=tuple(relations), select_related_paths=select_related,
+                             prefetch_related_paths=prefetch_related)
+
+    def iter_plans(self):
+        # this plan and the plans of every model below it
+        yield self
+        for relation in self.relations:
+            yield from relation.plan.iter_plans()
+
+    @property
+    def relation_names(self) -> tuple:
+        return tuple(relation.name for relation in self.relations)
+
+    def get_relation(self, name) -> RelationPlan:
+        for relation in self.relations:
+            if relation.name == name:
+                return relation
+        raise KeyError(name)
@@ -0,0 +1,57 @@
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SerializerCache:
+    DEFAULT_MAX_SIZE = 256
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+        # building is done outside the lock, a concurrent miss on the same key just builds an equal class twice
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+        return value
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            key, _ = self._entries.popitem(last=False)
+            logger.debug(f"evicting serializer from cache: {key}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self), "max_size": self.max_size}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+serializer_cache = SerializerCache()
@@ -0,0 +1,208 @@
+import csv
+import logging
+import os
+from collections import defaultdict, Counter
+
+from django.conf import settings
+from django.db import connections
+
+from .field_index import get_field_index
+from .json_utils import JsonUtils
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+CSV = "csv"
+PARQUET = "parquet"
+PK = "pk"
+TABLE_SEP = "."
+
+
+def get_table_name(plan) -> str:
+    # a model reached through several relations gets a table per path, their columns can differ. the table of the
+    # exported model is named after the model
+    return TABLE_SEP.join(plan.path) or plan.model._meta.model_name
+
+
+def encode_value(value):
+    # json field values are written as json text, so every column holds scalars
+    if isinstance(value, (dict, list)):
+        return JsonUtils.dumps_compact(value)
+    return value
+
+
+class CsvTableWriter:
+    extension = CSV
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.writers = {}
+        self.paths = {}
+
+    def write(self, table, model, columns, rows):
+        writer = self.writers.get(table)
+        if writer is None:
+            path = self.paths[table] = os.path.join(self.directory, f"{table}.{self.extension}")
+            f = self.files[table] = open(path, "w", encoding=JsonUtils.encoding, newline="")
+            writer = self.writers[table] = csv.writer(f)
+            writer.writerow(columns)
+        writer.writerows(["" if value is None else encode_value(value) for value in row] for row in rows)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def get_column_field(model, column):
+    if column == PK:
+        return model._meta.pk
+    for field in model._meta.concrete_fields:
+        if column in (field.name, field.attname):
+            return field
+    raise KeyError(column)
+
+
+def get_arrow_type(field):
+    # the column types come from the model fields, so every chunk is written with the same schema, also when all of
+    # its values are null. foreign keys take the type of the field they point at, anything else is written as text
+    if field.is_relation:
+        return get_arrow_type(field.target_field)
+    internal_type = field.get_internal_type()
+    if internal_type in INTEGER_FIELD_TYPES:
+        return pyarrow.int64()
+    elif internal_type == "FloatField":
+        return pyarrow.float64()
+    elif internal_type in ("BooleanField", "NullBooleanField"):
+        return pyarrow.bool_()
+    elif internal_type == "DateField":
+        return pyarrow.date32()
+    elif internal_type == "DateTimeField":
+        return pyarrow.timestamp("us", tz="UTC" if settings.USE_TZ else None)
+    return pyarrow.string()
+
+
+INTEGER_FIELD_TYPES = frozenset(("AutoField", "BigAutoField", "SmallAutoField", "IntegerField", "BigIntegerField",
+                                 "SmallIntegerField", "PositiveIntegerField", "PositiveSmallIntegerField"))
+
+
+class ParquetTableWriter:
+    # a parquet writer per table, every chunk of rows is written as a record batch, so only one chunk is held in memory
+    extension = PARQUET
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.writers = {}
+        self.schemas = {}
+        self.paths = {}
+
+    def write(self, table, model, columns, rows):
+        writer = self.writers.get(table)
+        if writer is None:
+            schema = self.schemas[table] = pyarrow.schema(
+                [(column, get_arrow_type(get_column_field(model, column))) for column in columns])
+            path = self.paths[table] = os.path.join(self.directory, f"{table}.{self.extension}")
+            writer = self.writers[table] = pyarrow.parquet.ParquetWriter(path, schema)
+        schema = self.schemas[table]
+        arrays = [pyarrow.array(self._encode_column(values, schema.field(index).type), type=schema.field(index).type)
+                  for index, values in enumerate(zip(*rows))]
+        writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+
+    @staticmethod
+    def _encode_column(values, arrow_type) -> list:
+        if arrow_type == pyarrow.string():
+            return [None if value is None else str(encode_value(value)) for value in values]
+        return list(values)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+TABLE_WRITERS = {CSV: CsvTableWriter, PARQUET: ParquetTableWriter}
+
+
+def get_table_writer(format, directory):
+    try:
+        Writer = TABLE_WRITERS[format]
+    except KeyError:
+        raise ValueError(f"unknown table format: {format}, expected one of {', '.join(TABLE_WRITERS)}")
+    if format == PARQUET and pyarrow is None:
+        raise ImportError(f"table format {format} needs pyarrow")
+    return Writer(directory)
+
+
+class TableExporter:
+    # walks the plan of the serializer, but fetches tuples with values_list per chunk of parent keys instead of model
+    # instances. every row holds its primary key, the fields of the plan, and the foreign key columns linking it to
+    # its parent or to the objects it points at. objects reached through a forward relation are written once per
+    # table, however many rows point at them
+
+    def __init__(self, plan, writer, chunk_size, using):
+        self.plan = plan
+        self.writer = writer
+        self.chunk_size = chunk_size
+        self.in_size = min(chunk_size, connections[using].features.max_query_params or chunk_size)
+        self.written = defaultdict(set)
+        self.counts = Counter()
+
+    def export(self, queryset) -> Counter:
+        columns = self._get_columns(self.plan)
+        rows = queryset.values_list(*columns).iterator(chunk_size=self.chunk_size)
+        for chunk in self.plan.model._iter_chunks(rows, self.chunk_size):
+            self._write_rows(self.plan, columns, chunk)
+        return self.counts
+
+    def _write_rows(self, plan, columns, rows):
+        table = get_table_name(plan)
+        self.writer.write(table, plan.model, columns, rows)
+        self.counts[table] += len(rows)
+        relations = get_field_index(plan.model).relations
+        for relation_plan in plan.relations:
+            relation = relations[relation_plan.name]
+            if not relation.accessible:
+                continue
+            if relation.forward:
+                position = columns.index(relation.attname)
+                written = self.written[get_table_name(relation_plan.plan)]
+                keys = {row[position] for row in rows if row[position] is not None} - written
+                written.update(keys)
+                self._write_related(relation_plan.plan, PK, sorted(keys))
+            else:
+                parent_attname = get_field_index(relation.related_model).relations[relation.reverse_field_name].attname
+                self._write_related(relation_plan.plan, relation.reverse_field_name, [row[0] for row in rows],
+                                    parent_attname)
+
+    def _write_related(self, plan, key_name, keys, parent_attname=None):
+        columns = self._get_columns(plan, parent_attname)
+        manager = plan.model._default_manager
+        for key_chunk in plan.model._iter_chunks(keys, self.in_size):
+            rows = manager.filter(**{key_name + "__in": key_chunk}).order_by(PK).values_list(*columns)
+            for chunk in plan.model._iter_chunks(rows.iterator(chunk_size=self.chunk_size), self.chunk_size):
+                self._write_rows(plan, columns, chunk)
+
+    @staticmethod
+    def _get_columns(plan, parent_attname=None) -> list:
+        relations = get_field_index(plan.model).relations
+        columns = [PK] + list(plan.fields)
+        columns += [relations[relation.name].attname for relation in plan.relations
+                    if relations[relation.name].forward]
+        if parent_attname is not None and parent_attname not in columns:
+            columns.append(parent_attname)
+        return columns
+
+
+def export_tables(plan, queryset, directory, format, chunk_size) -> dict:
+    # returns the (path, row count) of every table that got rows
+    writer = get_table_writer(format, directory)
+    try:
+        counts = TableExporter(plan, writer, chunk_size, queryset.db).export(queryset)
+    finally:
+        writer.close()
+    logger.debug(f"exported {sum(counts.values())} rows into {len(counts)} tables")
+    return {table: (writer.paths[table], count) for table, count in counts.items()}
@@ -0,0 +1,176 @@
+import copy
+from collections import namedtuple, defaultdict
+
+from .json_utils import JsonUtils
+
+ADD = "add"
+REMOVE = "remove"
+CHANGE = "change"
+
+# paths are made of dict keys, and of identities for the elements of relation lists. an identity is the tuple of the
+# values of the identity keys of the list. lists without identity keys, such as the lists in json attributes, are
+# changed as a whole, their order and duplicates are part of their value
+PatchOperation = namedtuple("PatchOperation", ["op", "path", "value"])
+
+
+def get_identity_keys(plan) -> dict:
+    # the natural key fields the elements of every list in the serialized trees are matched on, by the path of dict
+    # keys to the list. the root path is for a list of trees. natural key fields that are not serialized, such as the
+    # foreign key to the parent, are left out
+    identity_keys = {(): _get_serialized_natural_key(plan)}
+    for sub_plan in plan.iter_plans():
+        for relation in sub_plan.relations:
+            if relation.many:
+                identity_keys[relation.plan.path] = _get_serialized_natural_key(relation.plan)
+    return identity_keys
+
+
+def get_relation_paths(plan) -> frozenset:
+    return frozenset(sub_plan.path for sub_plan in plan.iter_plans())
+
+
+def _get_serialized_natural_key(plan) -> tuple:
+    get_natural_key_fields = getattr(plan.model, "_get_natural_key_fields", None)
+    if get_natural_key_fields is None:
+        return ()
+    return tuple(name for name in get_natural_key_fields() if name in plan.fields)
+
+
+def diff_trees(old, new, identity_keys=None) -> list:
+    operations = []
+    _diff(old, new, (), (), identity_keys or {}, operations)
+    return operations
+
+
+def _diff(old, new, path, key_path, identity_keys, operations):
+    # equal subtrees are skipped with a single comparison, so the cost follows the size of the changes
+    if old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                operations.append(PatchOperation(REMOVE, path + (key,), None))
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, path + (key,), key_path + (key,), identity_keys, operations)
+            else:
+                operations.append(PatchOperation(ADD, path + (key,), value))
+    elif isinstance(old, list) and isinstance(new, list) and identity_keys.get(key_path):
+        keys = identity_keys[key_path]
+        old_elements = _get_elements(old, keys, path)
+        new_elements = _get_elements(new, keys, path)
+        for identity in old_elements:
+            if identity not in new_elements:
+                operations.append(PatchOperation(REMOVE, path + (identity,), None))
+        for identity, element in new_elements.items():
+            if identity in old_elements:
+                _diff(old_elements[identity], element, path + (identity,), key_path, identity_keys, operations)
+            else:
+                operations.append(PatchOperation(ADD, path + (identity,), element))
+    else:
+        operations.append(PatchOperation(CHANGE, path, new))
+
+
+def _get_elements(elements, keys, path) -> dict:
+    return {identity: elements[index] for identity, index in _get_positions(elements, keys, path).items()}
+
+
+def _get_positions(elements, keys, path) -> dict:
+    # two elements with the same identity can't be told apart, a patch on either of them would be ambiguous
+    positions = {}
+    for index, element in enumerate(elements):
+        identity = _get_identity(element, keys)
+        if identity in positions:
+            raise ValueError(f"duplicate identity {identity} in the list at {path}")
+        positions[identity] = index
+    return positions
+
+
+def _get_identity(element, keys) -> tuple:
+    if keys and isinstance(element, dict):
+        return tuple(element.get(key) for key in keys)
+    return JsonUtils.fingerprint(element),
+
+
+def apply_patch(tree, patch, identity_keys=None):
+    # returns a patched copy. patches that went through json, with lists instead of tuples, can be applied as well
+    tree = copy.deepcopy(tree)
+    list_indexes = {}
+    for op, path, value in patch:
+        path = _normalize_path(path)
+        if not path:
+            tree = copy.deepcopy(value)
+            continue
+        parent, key_path = tree, ()
+        for element in path[:-1]:
+            if isinstance(parent, list):
+                parent = parent[_get_index(parent, element, key_path, identity_keys or {}, list_indexes)]
+            else:
+                parent, key_path = parent[element], key_path + (element,)
+        _apply_operation(parent, op, path[-1], value, key_path, identity_keys or {}, list_indexes)
+    return tree
+
+
+def _apply_operation(parent, op, key, value, key_path, identity_keys, list_indexes):
+    if isinstance(parent, dict):
+        if op == REMOVE:
+            parent.pop(key, None)
+        else:
+            parent[key] = copy.deepcopy(value)
+        return
+    index = _get_index(parent, key, key_path, identity_keys, list_indexes)
+    if op == REMOVE:
+        if index is not None:
+            del parent[index]
+            # the indexes after the removed element have shifted
+            del list_indexes[id(parent)]
+    elif index is None:
+        list_indexes[id(parent)][1][key] = len(parent)
+        parent.append(copy.deepcopy(value))
+    else:
+        parent[index] = copy.deepcopy(value)
+
+
+def _get_index(elements: list, identity, key_path, identity_keys, list_indexes):
+    # the position of every identity is indexed once per list, instead of searching the list for every operation. the
+    # list is kept with its index, so its id can't be reused by another list
+    indexed = list_indexes.get(id(elements))
+    if indexed is None or indexed[0] is not elements:
+        keys = identity_keys.get(key_path, ())
+        indexed = list_indexes[id(elements)] = elements, _get_positions(elements, keys, key_path)
+    return indexed[1].get(identity)
+
+
+def _normalize_path(path) -> tuple:
+    return tuple(element if isinstance(element, str) else tuple(element) for element in path)
+
+
+def get_changed_subtrees(tree, patch, identity_keys=None, relation_paths=None):
+    # the parts of a patched tree the patch touched: the attributes of every dict on the way to a change, and only
+    # the containers and list elements the changes are in. with relation paths, only relations are reduced, and
+    # other containers such as json attributes are kept whole
+    paths = [_normalize_path(operation[1]) for operation in patch]
+    return _reduce(tree, paths, (), identity_keys or {}, relation_paths)
+
+
+def _reduce(node, paths, key_path, identity_keys, relation_paths):
+    if not _is_reducible(node, key_path, relation_paths) or any(not path for path in paths):
+        return node
+    children = defaultdict(list)
+    for path in paths:
+        children[path[0]].append(path[1:])
+    if isinstance(node, dict):
+        reduced = {key: value for key, value in node.items()
+                   if not _is_reducible(value, key_path + (key,), relation_paths)}
+        for key, child_paths in children.items():
+            if key in node:
+                reduced[key] = _reduce(node[key], child_paths, key_path + (key,), identity_keys, relation_paths)
+        return reduced
+    keys = identity_keys.get(key_path, ())
+    return [_reduce(element, children[identity], key_path, identity_keys, relation_paths)
+            for element, identity in ((element, _get_identity(element, keys)) for element in node)
+            if identity in children]
+
+
+def _is_reducible(node, key_path, relation_paths) -> bool:
+    return isinstance(node, (dict, list)) and (relation_paths is None or key_path in relation_paths)
@@ -0,0 +1,167 @@
+import logging
+from collections import defaultdict
+
+from django.db import transaction, router
+
+from .field_index import get_field_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class WriteNode:
+    __slots__ = ("model", "instance", "field_names", "dependencies", "needs_pk", "level", "depth")
+
+    def __init__(self, model, instance, field_names, depth=0):
+        self.model = model
+        self.instance = instance
+        self.field_names = field_names
+        # (field name on this instance, node that has to be written first)
+        self.dependencies = []
+        self.needs_pk = False
+        self.level = None
+        # distance from the added root in the data, unlike the level which orders the writes
+        self.depth = depth
+
+
+class WritePlanner:
+    # turns validated nested data of any depth into batches per model, ordered so that every object is written
+    # after the objects its foreign keys point at. the number of statements is bound by the depth of the data
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, upsert=False):
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.nodes = []
+
+    def add(self, model, validated_data) -> WriteNode:
+        # the added objects are handed back to the caller, so their primary keys must be known
+        node = self._add_node(model, validated_data)
+        node.needs_pk = True
+        return node
+
+    def _add_node(self, model, validated_data, depth=0) -> WriteNode:
+        node = self.add_object(model, model._get_properties_from_data(validated_data), depth)
+        for relation_name, relation_data in model._get_relations_from_data(validated_data).items():
+            if relation_data is None:
+                continue
+            relation = get_field_index(model).relations[relation_name]
+            if not relation.many:
+                relation_data = [relation_data]
+            for relation_data_element in relation_data:
+                self.add_relation(node, relation, self._add_node(relation.related_model, relation_data_element,
+                                                                 depth + 1))
+        return node
+
+    def add_object(self, model, properties, depth=0) -> WriteNode:
+        # a single object without its related objects, they are linked to it with add_relation
+        node = WriteNode(model, model(**properties), list(properties), depth)
+        self.nodes.append(node)
+        return node
+
+    def add_relation(self, node, relation, related_node):
+        if relation.forward:
+            # forward relation, the related object must exist before this one points at it
+            self._add_dependency(node, relation.name, related_node)
+        else:
+            self._add_dependency(related_node, relation.reverse_field_name, node)
+
+    @staticmethod
+    def _add_dependency(node, field_name, dependency):
+        node.dependencies.append((field_name, dependency))
+        dependency.needs_pk = True
+
+    def get_batches(self) -> list:
+        batches = defaultdict(list)
+        for node in self.nodes:
+            batches[(self._get_level(node), node.model)].append(node)
+        ordered_keys = sorted(batches, key=lambda key: key[0])
+        return [(model, batches[(level, model)]) for level, model in ordered_keys]
+
+    def _get_level(self, node) -> int:
+        if node.level is None:
+            node.level = 1 + max((self._get_level(dependency) for _, dependency in node.dependencies), default=-1)
+        return node.level
+
+    def execute(self):
+        if not self.nodes:
+            return
+        with transaction.atomic(using=router.db_for_write(self.nodes[0].model)):
+            for model, nodes in self.get_batches():
+                logger.debug(f"writing {len(nodes)} objects of {model.__name__}")
+                for node in nodes:
+                    for field_name, dependency in node.dependencies:
+                        setattr(node.instance, field_name, dependency.instance)
+                if self.upsert:
+                    nodes = self._update_existing(model, nodes)
+                if nodes:
+                    model._bulk_create([node.instance for node in nodes], self.batch_size,
+                                       needs_pks=any(node.needs_pk for node in nodes))
+
+    def get_written_pks(self) -> dict:
+        # objects created in bulk without returning their primary keys are left out, every tree containing one of
+        # them also contains the object it was written for
+        written = defaultdict(set)
+        for node in self.nodes:
+            if node.instance.pk is not None:
+                written[node.model].add(node.instance.pk)
+        return written
+
+    def _update_existing(self, model, nodes) -> list:
+        # matches the nodes on their natural key against the stored rows. matched nodes take over the stored
+        # instance, and only the fields that differ are written. the nodes without a match are returned
+        key_attnames = [model._meta.get_field(name).attname for name in model._get_natural_key_fields()]
+        if not key_attnames:
+            return nodes
+        keys = [tuple(getattr(node.instance, attname) for attname in key_attnames) for node in nodes]
+        existing = self._fetch_existing(model, key_attnames, {key for key in keys if None not in key})
+        new_nodes, changed_instances, changed_fields = [], [], set()
+        created = {}
+        for node, key in zip(nodes, keys):
+            instance = existing.get(key)
+            if instance is None:
+                first = created.get(key)
+                if first is None:
+                    if None not in key:
+                        created[key] = node
+                    new_nodes.append(node)
+                else:
+                    self._merge_into(first, node)
+                continue
+            changed = [name for name in self._get_write_attnames(node)
+                       if getattr(instance, name) != getattr(node.instance, name)]
+            for name in changed:
+                setattr(instance, name, getattr(node.instance, name))
+            node.instance = instance
+            if changed:
+                changed_instances.append(instance)
+                changed_fields.update(changed)
+        if changed_instances:
+            logger.debug(f"updating {len(changed_instances)} objects of {model.__name__}")
+            model.objects.bulk_update(changed_instances, changed_fields, batch_size=self.batch_size)
+        return new_nodes
+
+    def _merge_into(self, first, node):
+        # a natural key repeated in the batch is created once, later nodes write their values into the first instance
+        for name in self._get_write_attnames(node):
+            setattr(first.instance, name, getattr(node.instance, name))
+        first.needs_pk = first.needs_pk or node.needs_pk
+        node.instance = first.instance
+
+    def _fetch_existing(self, model, key_attnames, keys) -> dict:
+        # a single IN query on the first key field per batch, the remaining key fields are matched in python
+        first_values = list({key[0] for key in keys})
+        existing = {}
+        for start in range(0, len(first_values), self.batch_size):
+            lookup = {key_attnames[0] + "__in": first_values[start:start + self.batch_size]}
+            for instance in model.objects.filter(**lookup):
+                key = tuple(getattr(instance, attname) for attname in key_attnames)
+                if key in keys:
+                    existing[key] = instance
+        return existing
+
+    @staticmethod
+    def _get_write_attnames(node) -> list:
+        relations = get_field_index(node.model).relations
+        related_attnames = [relations[field_name].attname for field_name, _ in node.dependencies]
+        return node.field_names + related_attnames
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-18 10:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+import generic_serializer.serializable_model
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_app', '0002_dataprovider_endpoint_httpconfig_oauthconfig'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestTreeNode',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('parent', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='test_app.TestTreeNode')),
+                ('previous', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='next', to='test_app.TestTreeNode')),
+            ],
+            bases=(models.Model, generic_serializer.serializable_model.SerializableModel),
+        ),
+    ]
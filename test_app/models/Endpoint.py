@@ -8,6 +8,8 @@ from test_app.models.RequestType import RequestType
 
 
 class Endpoint(models.Model, SerializableModel):
+    natural_key_fields = ("data_provider", "endpoint_name")
+
     endpoint_name = models.TextField()
     endpoint_url = models.TextField()
     request_type = models.CharField(choices=RequestType.build_choices(), default=RequestType.GET.value, max_length=10)
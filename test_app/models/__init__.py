@@ -2,4 +2,4 @@ from .DataProvider import DataProvider
 from .Endpoint import Endpoint
 from .HttpConfig import HttpConfig
 from .OauthConfig import OauthConfig
-from .test_models import TestModel3, TestModel1, TestModel2
+from .test_models import TestModel3, TestModel1, TestModel2, TestTreeNode
@@ -16,3 +16,9 @@ class TestModel2(models.Model, SerializableModel):
 class TestModel1(models.Model, SerializableModel):
     text = models.TextField()
     test_model2 = models.ForeignKey(TestModel2, on_delete=models.CASCADE)
+
+
+class TestTreeNode(models.Model, SerializableModel):
+    text = models.TextField()
+    parent = models.ForeignKey("self", null=True, related_name="children", on_delete=models.CASCADE)
+    previous = models.ForeignKey("self", null=True, related_name="next", on_delete=models.SET_NULL)
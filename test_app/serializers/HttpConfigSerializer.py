@@ -1,5 +1,6 @@
-from rest_framework.serializers import ModelSerializer, JSONField
+from rest_framework.serializers import ModelSerializer
 
+from generic_serializer.native_model_serializer import NativeJSONField as JSONField
 from test_app.models import HttpConfig
 
 
@@ -0,0 +1,39 @@
+import django
+from django.test import TransactionTestCase
+
+from benchmarks.graph_generator import GraphGenerator
+from benchmarks.run import run_suite, compare
+from test_app.models import DataProvider, Endpoint, TestModel1, TestModel2, TestModel3
+
+
+class TestBenchmarks(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+
+    def test_graph_generator(self):
+        generator = GraphGenerator(fan_out=3)
+        generator.create_data_providers(2)
+        generator.create_test_model_graph(2)
+        self.assertEqual(2, DataProvider.objects.count())
+        self.assertEqual(6, Endpoint.objects.count())
+        self.assertEqual(2, TestModel3.objects.count())
+        self.assertEqual(6, TestModel2.objects.count())
+        self.assertEqual(18, TestModel1.objects.count())
+
+    def test_run_suite(self):
+        results = run_suite("tiny", repeat=1)
+        self.assertSetEqual({"serialize", "serialize_queryset", "deserialize", "deserialize_many",
+                             "test_model_serialize_queryset"}, set(results))
+        # the number of queries of a queryset export doesn't grow with the number of roots
+        self.assertEqual(2, results["serialize_queryset"]["queries"])
+        self.assertEqual(1, results["test_model_serialize_queryset"]["queries"])
+        self.assertEqual(0, DataProvider.objects.filter(provider_name__startswith="new_provider").count())
+
+    def test_compare(self):
+        baseline = {"serialize": {"seconds": 1.0, "queries": 4, "peak_memory": 1000}}
+        self.assertEqual([], compare({"serialize": {"seconds": 1.2, "queries": 4, "peak_memory": 900}}, baseline))
+        self.assertEqual(2, len(compare({"serialize": {"seconds": 2.0, "queries": 5, "peak_memory": 1000}},
+                                        baseline)))
@@ -0,0 +1,57 @@
+import django
+from django.test import TransactionTestCase, override_settings
+
+from generic_serializer.field_index import get_field_index
+from generic_serializer.native_model_serializer import NativeJSONField
+from test_app.models import DataProvider, Endpoint, HttpConfig, TestModel2
+
+
+class TestFieldIndex(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+
+    def test_attribute_names(self):
+        index = get_field_index(HttpConfig)
+        self.assertEqual(("header", "url_encoded_params", "body_type", "body_content", "request_type"),
+                         index.attribute_names)
+        self.assertIsInstance(index.attribute_name_set, frozenset)
+
+    def test_custom_fields(self):
+        index = get_field_index(HttpConfig)
+        self.assertEqual((("header", NativeJSONField), ("url_encoded_params", NativeJSONField)),
+                         index.custom_fields)
+
+    def test_reverse_relations(self):
+        relations = get_field_index(DataProvider).relations
+        self.assertSetEqual({"endpoints", "http_config", "oauth_config"}, set(relations))
+        self.assertTrue(relations["endpoints"].many)
+        self.assertFalse(relations["endpoints"].forward)
+        self.assertEqual(relations["endpoints"].related_model, Endpoint)
+        self.assertEqual(relations["endpoints"].reverse_field_name, "data_provider")
+        self.assertFalse(relations["http_config"].many)
+
+    def test_forward_relations(self):
+        relations = get_field_index(Endpoint).relations
+        self.assertTrue(relations["data_provider"].forward)
+        self.assertFalse(relations["data_provider"].many)
+        self.assertEqual(relations["data_provider"].attname, "data_provider_id")
+
+    def test_reverse_relation_without_related_name_is_not_accessible(self):
+        relations = get_field_index(TestModel2).relations
+        self.assertFalse(relations["testmodel1"].accessible)
+        self.assertTrue(relations["test_model3"].accessible)
+
+    def test_index_is_cached_and_immutable(self):
+        index = get_field_index(DataProvider)
+        self.assertIs(index, get_field_index(DataProvider))
+        with self.assertRaises(TypeError):
+            index.relations["endpoints"] = None
+
+    def test_index_is_cleared_when_installed_apps_change(self):
+        index = get_field_index(DataProvider)
+        with override_settings(INSTALLED_APPS=["django.contrib.contenttypes", "test_app"]):
+            pass
+        self.assertIsNot(index, get_field_index(DataProvider))
@@ -0,0 +1,69 @@
+import json
+from unittest import skipUnless
+
+import django
+from django.test import TransactionTestCase, override_settings
+
+from generic_serializer.json_backend import get_json_backend, orjson, ujson, JSON_BACKEND_SETTING, STDLIB, \
+    ORJSON, UJSON
+from generic_serializer.json_utils import JsonUtils
+
+
+class TestJsonBackend(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.data = {"provider_name": "strava", "scope": ["read", "write"], "count": 3, "ratio": 0.5, "active": True,
+                    "header": None, "name": "æøå"}
+
+    def setUp(self):
+        get_json_backend.cache_clear()
+
+    def tearDown(self):
+        get_json_backend.cache_clear()
+
+    def test_auto_picks_installed_backend(self):
+        expected = ORJSON if orjson is not None else UJSON if ujson is not None else STDLIB
+        self.assertEqual(expected, JsonUtils.get_backend().name)
+
+    def test_backend_from_setting(self):
+        with override_settings(**{JSON_BACKEND_SETTING: STDLIB}):
+            self.assertEqual(STDLIB, JsonUtils.get_backend().name)
+        self.assertEqual(get_json_backend("auto").name, JsonUtils.get_backend().name)
+
+    def test_unknown_backend(self):
+        with override_settings(**{JSON_BACKEND_SETTING: "yaml"}):
+            with self.assertRaises(ValueError):
+                JsonUtils.get_backend()
+
+    def test_stdlib_round_trip(self):
+        self.assert_round_trip(STDLIB)
+
+    @skipUnless(orjson, "orjson is not installed")
+    def test_orjson_round_trip(self):
+        self.assert_round_trip(ORJSON)
+
+    @skipUnless(ujson, "ujson is not installed")
+    def test_ujson_round_trip(self):
+        self.assert_round_trip(UJSON)
+
+    def test_loads_without_encoding_kwarg(self):
+        text = json.dumps(self.data)
+        self.assertEqual(self.data, JsonUtils.loads(text))
+        self.assertEqual(self.data, JsonUtils.validate(text))
+        self.assertEqual(self.data, JsonUtils.validate(self.data))
+        self.assertEqual(self.data, json.loads(JsonUtils.clean(text)))
+
+    def assert_round_trip(self, name):
+        with override_settings(**{JSON_BACKEND_SETTING: name}):
+            compact = JsonUtils.dumps_compact(self.data)
+            pretty = JsonUtils.dumps(self.data)
+            self.assertNotIn("\n", compact)
+            self.assertIn("\n", pretty)
+            self.assertEqual(self.data, json.loads(compact))
+            self.assertEqual(self.data, json.loads(pretty))
+            self.assertIsInstance(JsonUtils.dumps_bytes(self.data), bytes)
+            self.assertEqual(self.data, JsonUtils.loads(JsonUtils.dumps_bytes(self.data)))
+            self.assertEqual(self.data, JsonUtils.loads(JsonUtils.dumps_bytes(self.data, pretty=True)))
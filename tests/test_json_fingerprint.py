@@ -0,0 +1,63 @@
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer.json_utils import JsonUtils
+from test_app.models import DataProvider, Endpoint
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestJsonFingerprint(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def test_canonical_dumps(self):
+        self.assertEqual(b'{"a":[1,0.1,"\xc3\xa6"],"b":{"c":null,"d":true}}',
+                         JsonUtils.canonical_dumps({"b": {"d": True, "c": None}, "a": [1, 0.1, "æ"]}))
+
+    def test_hash(self):
+        self.assertEqual(JsonUtils.hash("abc"), JsonUtils.hash(b"abc"))
+        self.assertEqual(2 * JsonUtils.hash_digest_size, len(JsonUtils.hash("abc")))
+        self.assertNotEqual(JsonUtils.hash("abc"), JsonUtils.hash("abd"))
+
+    def test_fingerprint_ignores_key_order(self):
+        data = MockDataProvider.build_full_data()
+        reordered = dict(reversed(list(data.items())))
+        self.assertEqual(JsonUtils.fingerprint(data), JsonUtils.fingerprint(reordered))
+        self.assertEqual(JsonUtils.fingerprint(data), JsonUtils.dump_and_hash(data))
+
+    def test_fingerprint_changes_with_content(self):
+        data = MockDataProvider.build_full_data()
+        changed = MockDataProvider.build_full_data()
+        changed["endpoints"][1]["endpoint_url"] = "changed"
+        self.assertNotEqual(JsonUtils.fingerprint(data), JsonUtils.fingerprint(changed))
+        self.assertNotEqual(JsonUtils.fingerprint({"a": [1]}), JsonUtils.fingerprint({"a": "[1]"}))
+        self.assertNotEqual(JsonUtils.fingerprint([1, 2]), JsonUtils.fingerprint([2, 1]))
+
+    def test_subtree_fingerprints(self):
+        data = MockDataProvider.build_full_data()
+        changed = MockDataProvider.build_full_data()
+        changed["endpoints"][1]["endpoint_url"] = "changed"
+        fingerprints = JsonUtils.subtree_fingerprints(data)
+        changed_fingerprints = JsonUtils.subtree_fingerprints(changed)
+        self.assertEqual(JsonUtils.fingerprint(data), fingerprints[()])
+        self.assertEqual(JsonUtils.fingerprint(data["endpoints"][0]), fingerprints[("endpoints", 0)])
+        self.assertEqual(fingerprints[("oauth_config",)], changed_fingerprints[("oauth_config",)])
+        self.assertEqual(fingerprints[("endpoints", 0)], changed_fingerprints[("endpoints", 0)])
+        self.assertNotEqual(fingerprints[("endpoints", 1)], changed_fingerprints[("endpoints", 1)])
+        self.assertNotEqual(fingerprints[("endpoints",)], changed_fingerprints[("endpoints",)])
+
+    def test_model_fingerprint(self):
+        data_provider = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        fingerprint = data_provider.fingerprint(self.filter)
+        self.assertEqual(fingerprint, DataProvider.objects.get().fingerprint(self.filter))
+        Endpoint.objects.filter(endpoint_name="test1").update(endpoint_url="changed")
+        self.assertNotEqual(fingerprint, DataProvider.objects.get().fingerprint(self.filter))
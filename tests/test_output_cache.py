@@ -0,0 +1,116 @@
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from generic_serializer import SerializableModelFilter, output_cache
+from generic_serializer.output_cache import get_output_cache_dependencies
+from test_app.models import DataProvider, Endpoint, OauthConfig, TestTreeNode
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestOutputCache(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def setUp(self):
+        DataProvider.cache_serialized_output = True
+        get_output_cache_dependencies.cache_clear()
+        cache.clear()
+        self.data_provider = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        output_cache.reset_stats()
+
+    def tearDown(self):
+        DataProvider.cache_serialized_output = False
+        get_output_cache_dependencies.cache_clear()
+        cache.clear()
+
+    def test_dependencies(self):
+        dependencies = get_output_cache_dependencies()
+        self.assertIn((DataProvider, ""), dependencies[DataProvider])
+        self.assertIn((DataProvider, "endpoints"), dependencies[Endpoint])
+        self.assertIn((DataProvider, "oauth_config"), dependencies[OauthConfig])
+
+    def test_cache_hit(self):
+        data = self.get_data_provider().serialize(self.filter)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(data, self.data_provider.serialize(self.filter))
+        self.assertEqual(0, len(queries))
+        self.assertEqual({"hits": 1, "misses": 1, "invalidations": 0, "hit_rate": 0.5}, output_cache.stats())
+
+    def test_filters_are_cached_separately(self):
+        data = self.data_provider.serialize(self.filter)
+        filter = SerializableModelFilter(max_depth=0, start_object_name="data_provider")
+        self.assertEqual({"provider_name": "dsfsd4", "api_endpoint": "56"}, self.data_provider.serialize(filter))
+        self.assertEqual(data, self.data_provider.serialize(self.filter))
+
+    def test_related_save_invalidates_root(self):
+        self.data_provider.serialize(self.filter)
+        endpoint = Endpoint.objects.get(endpoint_name="test1")
+        endpoint.endpoint_url = "changed"
+        endpoint.save()
+        data = self.data_provider.serialize(self.filter)
+        self.assertIn("changed", [endpoint["endpoint_url"] for endpoint in data["endpoints"]])
+        self.assertEqual(1, output_cache.invalidations)
+
+    def test_root_save_invalidates(self):
+        self.data_provider.serialize(self.filter)
+        self.data_provider.api_endpoint = "changed"
+        self.data_provider.save()
+        self.assertEqual("changed", self.get_data_provider().serialize(self.filter)["api_endpoint"])
+
+    def test_related_delete_invalidates_root(self):
+        self.data_provider.serialize(self.filter)
+        Endpoint.objects.get(endpoint_name="test1").delete()
+        data = self.data_provider.serialize(self.filter)
+        self.assertEqual(["test2"], [endpoint["endpoint_name"] for endpoint in data["endpoints"]])
+
+    def test_upsert_invalidates_root(self):
+        self.data_provider.serialize(self.filter)
+        data = MockDataProvider.build_full_data()
+        data["endpoints"][0]["endpoint_url"] = "changed"
+        DataProvider.deserialize(data, self.filter, upsert=True)
+        data = self.data_provider.serialize(self.filter)
+        self.assertIn("changed", [endpoint["endpoint_url"] for endpoint in data["endpoints"]])
+
+    def test_unrelated_save_does_not_invalidate(self):
+        self.data_provider.serialize(self.filter)
+        DataProvider.objects.create(provider_name="other")
+        self.data_provider.serialize(self.filter)
+        self.assertEqual(1, output_cache.hits)
+
+    def test_self_foreign_key(self):
+        TestTreeNode.cache_serialized_output = True
+        get_output_cache_dependencies.cache_clear()
+        try:
+            # a tree node can be nested at any depth, so a save invalidates the trees of every node
+            self.assertEqual([(TestTreeNode, None)], get_output_cache_dependencies()[TestTreeNode])
+            grandparent = TestTreeNode.objects.create(text="grandparent")
+            parent = TestTreeNode.objects.create(text="parent", parent=grandparent)
+            child = TestTreeNode.objects.create(text="child", parent=parent, previous=parent)
+            other = TestTreeNode.objects.create(text="other")
+            filter = SerializableModelFilter(max_depth=2, start_object_name="test_tree_node")
+            self.assertEqual("grandparent", child.serialize(filter)["parent"]["parent"]["text"])
+            other.serialize(filter)
+            grandparent.text = "changed"
+            with CaptureQueriesContext(connection) as queries:
+                grandparent.save()
+            self.assertEqual(1, len(queries))
+            self.assertEqual("changed", child.serialize(filter)["parent"]["parent"]["text"])
+            other.serialize(filter)
+            self.assertEqual(0, output_cache.hits)
+        finally:
+            TestTreeNode.cache_serialized_output = False
+
+    @staticmethod
+    def get_data_provider():
+        return DataProvider.objects.get(provider_name="dsfsd4")
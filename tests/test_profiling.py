@@ -0,0 +1,71 @@
+import django
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from generic_serializer import SerializableModelFilter, profile
+from generic_serializer.profiling import get_active_profile
+from generic_serializer.serializable_model import OUTPUT_JSON_BYTES
+from test_app.models import DataProvider
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestProfiling(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def test_serialize(self):
+        data_provider = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        data_provider = DataProvider.objects.get(pk=data_provider.pk)
+        with profile() as report:
+            with CaptureQueriesContext(connection) as queries:
+                data_provider.serialize(self.filter, OUTPUT_JSON_BYTES)
+        result = report.as_dict()
+        self.assertEqual(len(queries), result["queries"]["count"])
+        self.assertSetEqual({"build", "fetch", "render", "encode"}, set(result["phases"]))
+        self.assertDictEqual({0: 1}, result["nodes"]["test_app.dataprovider"])
+        self.assertDictEqual({1: 2}, result["nodes"]["test_app.endpoint"])
+        self.assertDictEqual({1: 1}, result["nodes"]["test_app.httpconfig"])
+        self.assertDictEqual({1: 1}, result["nodes"]["test_app.oauthconfig"])
+        self.assertEqual(5, result["node_count"])
+        self.assertIsNone(get_active_profile())
+
+    def test_serialize_queryset(self):
+        DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        with profile() as report:
+            DataProvider.serialize_queryset(DataProvider.objects.all(), self.filter)
+        result = report.as_dict()
+        self.assertEqual(2, result["queries"]["count"])
+        self.assertGreater(result["phases"]["fetch"], 0)
+        self.assertNotIn("encode", result["phases"])
+        self.assertEqual(5, result["node_count"])
+
+    def test_deserialize_callback(self):
+        reports = []
+        with profile(callback=reports.append):
+            DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        report, = reports
+        self.assertSetEqual({"build", "validate", "write"}, set(report["phases"]))
+        self.assertGreater(report["queries"]["count"], 0)
+        self.assertDictEqual({0: 1}, report["nodes"]["test_app.dataprovider"])
+        self.assertDictEqual({1: 2}, report["nodes"]["test_app.endpoint"])
+        self.assertGreaterEqual(report["seconds"], sum(report["phases"].values()))
+
+    def test_nested_profiles(self):
+        DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        with profile() as outer:
+            with profile() as inner:
+                DataProvider.serialize_queryset(DataProvider.objects.all(), self.filter)
+            self.assertIs(outer, get_active_profile())
+        self.assertEqual(5, inner.as_dict()["node_count"])
+        self.assertEqual(0, outer.as_dict()["node_count"])
+        # the wrappers of both profiles see the queries
+        self.assertEqual(2, outer.as_dict()["queries"]["count"])
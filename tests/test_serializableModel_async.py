@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter, profile
+from generic_serializer.async_utils import run_in_thread
+from test_app.models import DataProvider, Endpoint
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestSerializableModelAsync(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def test_adeserialize(self):
+        data_provider = self.run_async(DataProvider.adeserialize(MockDataProvider.build_full_data(), self.filter))
+        self.assertEqual(data_provider.provider_name, "dsfsd4")
+        self.assertEqual(Endpoint.objects.count(), 2)
+
+    def test_aserialize(self):
+        data_provider = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        self.assertEqual(data_provider.serialize(self.filter), self.run_async(data_provider.aserialize(self.filter)))
+
+    def test_aserialize_queryset_concurrently(self):
+        for i in range(3):
+            data = MockDataProvider.build_full_data()
+            data["provider_name"] = f"provider{i}"
+            DataProvider.deserialize(data, self.filter)
+        queryset = DataProvider.objects.order_by("pk")
+        expected = DataProvider.serialize_queryset(queryset, self.filter)
+
+        async def export_concurrently():
+            return await asyncio.gather(*(DataProvider.aserialize_queryset(queryset, self.filter) for _ in range(4)))
+
+        self.assertEqual([expected] * 4, self.run_async(export_concurrently()))
+
+    def test_run_in_thread_overlaps(self):
+        threads = set()
+
+        def wait():
+            threads.add(threading.get_ident())
+            time.sleep(0.2)
+
+        async def wait_concurrently():
+            await asyncio.gather(*(run_in_thread(wait) for _ in range(4)))
+
+        start = time.perf_counter()
+        self.run_async(wait_concurrently())
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertGreater(len(threads), 1)
+
+    def test_aserialize_keeps_profile(self):
+        data_provider = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        with profile() as report:
+            self.run_async(data_provider.aserialize(self.filter))
+        self.assertEqual(5, report.as_dict()["node_count"])
+        self.assertIn("render", report.as_dict()["phases"])
+
+    @staticmethod
+    def run_async(coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
@@ -0,0 +1,81 @@
+import unittest
+
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer.binary_codec import get_binary_codec, msgpack, cbor2, MSGPACK, CBOR
+from generic_serializer.serializable_model import OUTPUT_JSON_BYTES, OUTPUT_MSGPACK, OUTPUT_CBOR, INPUT_JSON, \
+    INPUT_MSGPACK, INPUT_CBOR
+from test_app.models import DataProvider, HttpConfig
+from tests.mock_data_provider import MockDataProvider
+
+JSON_FIELD_CONTENT = {
+    "unicode": "æøå ✓ \U0001F600",
+    "nested": [[1, 2.5, -3], {"empty": {}, "list": []}],
+    "float": 0.1,
+    "large": 2 ** 62,
+    "negative": -2 ** 62,
+    "flags": [True, False, None],
+    "empty_string": "",
+}
+
+
+class TestSerializableModelBinaryOutput(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def setUp(self):
+        data = MockDataProvider.build_full_data()
+        data["http_config"]["header"] = JSON_FIELD_CONTENT
+        self.data_provider = DataProvider.deserialize(data, self.filter)
+
+    def test_json_input(self):
+        data = self.data_provider.serialize(self.filter, OUTPUT_JSON_BYTES)
+        DataProvider.objects.all().delete()
+        data_provider = DataProvider.deserialize(data, self.filter, input=INPUT_JSON)
+        self.assertDictEqual(JSON_FIELD_CONTENT, HttpConfig.objects.get(data_provider=data_provider).header)
+
+    def test_unknown_modes(self):
+        with self.assertRaises(ValueError):
+            self.data_provider.serialize(self.filter, "xml")
+        with self.assertRaises(ValueError):
+            DataProvider.deserialize(b"", self.filter, input="xml")
+
+    @unittest.skipIf(msgpack, "msgpack is installed")
+    def test_codec_not_installed(self):
+        with self.assertRaises(ImportError):
+            self.data_provider.serialize(self.filter, OUTPUT_MSGPACK)
+
+    @unittest.skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_round_trip(self):
+        self.assert_round_trip(OUTPUT_MSGPACK, INPUT_MSGPACK)
+
+    @unittest.skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack_refuses_large_integers(self):
+        with self.assertRaises(ValueError):
+            get_binary_codec(MSGPACK).dumps({"large": 2 ** 64})
+
+    @unittest.skipUnless(cbor2, "cbor2 is not installed")
+    def test_cbor_round_trip(self):
+        self.assert_round_trip(OUTPUT_CBOR, INPUT_CBOR)
+        self.assertEqual({"large": 2 ** 100}, get_binary_codec(CBOR).loads(get_binary_codec(CBOR).dumps(
+            {"large": 2 ** 100})))
+
+    def assert_round_trip(self, output, input):
+        expected = self.data_provider.serialize(self.filter)
+        data = self.data_provider.serialize(self.filter, output)
+        self.assertIsInstance(data, bytes)
+        self.assertLess(len(data), len(self.data_provider.serialize(self.filter, OUTPUT_JSON_BYTES)))
+        DataProvider.objects.all().delete()
+        data_provider = DataProvider.deserialize(data, self.filter, input=input)
+        self.assertDictEqual(JSON_FIELD_CONTENT, HttpConfig.objects.get(data_provider=data_provider).header)
+        self.assertDictEqual(expected, DataProvider.objects.get(pk=data_provider.pk).serialize(self.filter))
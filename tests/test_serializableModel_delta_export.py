@@ -0,0 +1,80 @@
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter
+from test_app.models import DataProvider, Endpoint, OauthConfig, HttpConfig
+from tests.mock_data_provider import MockDataProvider
+
+WATERMARK_MODELS = (DataProvider, Endpoint, OauthConfig, HttpConfig)
+
+
+class TestSerializableModelDeltaExport(TransactionTestCase):
+    # the primary keys serve as a version that increases on every insert
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def setUp(self):
+        for model in WATERMARK_MODELS:
+            model.watermark_field = "id"
+        data = []
+        for i in range(3):
+            tree = MockDataProvider.build_full_data()
+            tree["provider_name"] = f"provider{i}"
+            data.append(tree)
+        DataProvider.deserialize_many(data, self.filter)
+
+    def tearDown(self):
+        for model in WATERMARK_MODELS:
+            model.watermark_field = None
+
+    def test_full_export_without_watermark(self):
+        data, watermark = DataProvider.export_changed_since(None, self.filter)
+        self.assertEqual(["provider0", "provider1", "provider2"], [tree["provider_name"] for tree in data])
+        self.assertEqual(max(DataProvider.objects.values_list("id", flat=True)), watermark["test_app.dataprovider"])
+        self.assertEqual(max(Endpoint.objects.values_list("id", flat=True)), watermark["test_app.endpoint"])
+
+    def test_nothing_changed(self):
+        _, watermark = DataProvider.export_changed_since(None, self.filter)
+        data, new_watermark = DataProvider.export_changed_since(watermark, self.filter)
+        self.assertEqual([], data)
+        self.assertEqual(watermark, new_watermark)
+
+    def test_changed_descendant_exports_root(self):
+        _, watermark = DataProvider.export_changed_since(None, self.filter)
+        Endpoint.objects.create(endpoint_name="new", endpoint_url="url",
+                                data_provider=DataProvider.objects.get(provider_name="provider1"))
+        data, new_watermark = DataProvider.export_changed_since(watermark, self.filter)
+        self.assertEqual(["provider1"], [tree["provider_name"] for tree in data])
+        self.assertIn("new", [endpoint["endpoint_name"] for endpoint in data[0]["endpoints"]])
+        self.assertEqual(watermark["test_app.endpoint"] + 1, new_watermark["test_app.endpoint"])
+        self.assertEqual([], DataProvider.export_changed_since(new_watermark, self.filter)[0])
+
+    def test_new_roots_and_descendants_are_exported_once(self):
+        _, watermark = DataProvider.export_changed_since(None, self.filter)
+        tree = MockDataProvider.build_full_data()
+        tree["provider_name"] = "provider3"
+        DataProvider.deserialize(tree, self.filter)
+        queryset, _ = DataProvider.get_changed_since(watermark, self.filter)
+        self.assertEqual(["provider3"], list(queryset.values_list("provider_name", flat=True)))
+
+    def test_model_missing_from_watermark_counts_as_changed(self):
+        _, watermark = DataProvider.export_changed_since(None, self.filter)
+        del watermark["test_app.oauthconfig"]
+        OauthConfig.objects.filter(data_provider__provider_name="provider0").delete()
+        data, new_watermark = DataProvider.export_changed_since(watermark, self.filter)
+        self.assertEqual(["provider1", "provider2"], [tree["provider_name"] for tree in data])
+        self.assertIn("test_app.oauthconfig", new_watermark)
+
+    def test_without_watermark_field(self):
+        for model in WATERMARK_MODELS:
+            model.watermark_field = None
+        with self.assertRaises(ValueError):
+            DataProvider.get_changed_since(None, self.filter)
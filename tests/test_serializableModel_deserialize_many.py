@@ -0,0 +1,66 @@
+import django
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from generic_serializer import SerializableModelFilter
+from test_app.models import DataProvider, Endpoint, OauthConfig, HttpConfig
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestSerializableModelDeserializeMany(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def test_deserialize_many(self):
+        data = self.build_data(3)
+        data_providers = DataProvider.deserialize_many(data, self.filter)
+        self.assertEqual(len(data_providers), 3)
+        self.assertEqual(DataProvider.objects.count(), 3)
+        self.assertEqual(Endpoint.objects.count(), 6)
+        self.assertEqual(OauthConfig.objects.count(), 3)
+        self.assertEqual(HttpConfig.objects.count(), 3)
+        data_provider = DataProvider.objects.get(provider_name="provider1")
+        self.assertEqual(data_provider.oauth_config.scope, data[1]["oauth_config"]["scope"])
+        self.assertEqual(data_provider.http_config.header, data[1]["http_config"]["header"])
+        self.assertSetEqual({"test1", "test2"}, set(data_provider.endpoints.values_list("endpoint_name", flat=True)))
+
+    def test_deserialize_many_inserts_children_in_batches(self):
+        data = self.build_data(10)
+        with CaptureQueriesContext(connection) as queries:
+            DataProvider.deserialize_many(data, self.filter, batch_size=8)
+        endpoint_inserts = [q for q in queries if q["sql"].startswith('INSERT INTO "test_app_endpoint"')]
+        oauth_inserts = [q for q in queries if q["sql"].startswith('INSERT INTO "test_app_oauthconfig"')]
+        self.assertEqual(len(endpoint_inserts), 3)
+        self.assertEqual(len(oauth_inserts), 2)
+
+    def test_deserialize_many_returns_saved_instances(self):
+        data = [{"provider_name": f"provider{i}"} for i in range(5)]
+        data_providers = DataProvider.deserialize_many(data, self.filter)
+        self.assertEqual(DataProvider.objects.count(), 5)
+        self.assertSetEqual({dp.pk for dp in data_providers}, set(DataProvider.objects.values_list("pk", flat=True)))
+
+    def test_deserialize_many_invalid_creates_nothing(self):
+        data = self.build_data(2)
+        del data[1]["provider_name"]
+        with self.assertRaises(ValidationError):
+            DataProvider.deserialize_many(data, self.filter)
+        self.assertEqual(DataProvider.objects.count(), 0)
+
+    @staticmethod
+    def build_data(count):
+        data = []
+        for i in range(count):
+            tree = MockDataProvider.build_full_data()
+            tree["provider_name"] = f"provider{i}"
+            data.append(tree)
+        return data
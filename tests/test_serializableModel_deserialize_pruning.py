@@ -0,0 +1,65 @@
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter, serializer_cache
+from generic_serializer.serialization_plan import SerializationPlan
+from test_app.models import DataProvider, Endpoint, OauthConfig, HttpConfig, TestModel1
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestSerializableModelDeserializePruning(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=2,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def setUp(self):
+        serializer_cache.clear()
+
+    def test_prune_to_data_keeps_present_relations(self):
+        plan = DataProvider._get_plan(self.filter)
+        pruned = plan.prune_to_data(MockDataProvider.build_base_with_endpoints_data())
+        self.assertEqual(("endpoints",), pruned.relation_names)
+        self.assertEqual((), pruned.get_relation("endpoints").plan.relations)
+        self.assertEqual(plan.fields, pruned.fields)
+        self.assertEqual(("endpoints",), pruned.prefetch_related_paths)
+        self.assertEqual((), pruned.select_related_paths)
+
+    def test_prune_to_data_unions_keys_of_list(self):
+        plan = DataProvider._get_plan(self.filter)
+        data = [MockDataProvider.build_base_with_http_data(), MockDataProvider.build_base_with_oauth_data()]
+        self.assertSetEqual({"http_config", "oauth_config"}, set(plan.prune_to_data(data).relation_names))
+
+    def test_prune_to_data_nested(self):
+        filter = SerializableModelFilter(max_depth=3, start_object_name="test_model1")
+        plan = SerializationPlan.compile(TestModel1, filter)
+        pruned = plan.prune_to_data({"test_model2": {"test_model3": None}})
+        self.assertEqual(("test_model2",), pruned.relation_names)
+        self.assertEqual(("test_model3",), pruned.get_relation("test_model2").plan.relation_names)
+
+    def test_prune_to_data_full_payload_returns_same_plan(self):
+        filter = SerializableModelFilter(max_depth=1, exclude_labels=("dataprovideruser", "data_provider_node"),
+                                         start_object_name="data_provider")
+        plan = DataProvider._get_plan(filter)
+        self.assertIs(plan, plan.prune_to_data(MockDataProvider.build_full_data()))
+
+    def test_deserialize_partial_payload(self):
+        DataProvider.deserialize(MockDataProvider.build_base_with_endpoints_data(), self.filter)
+        self.assertEqual(DataProvider.objects.count(), 1)
+        self.assertEqual(Endpoint.objects.count(), 2)
+        self.assertEqual(OauthConfig.objects.count(), 0)
+        self.assertEqual(HttpConfig.objects.count(), 0)
+
+    def test_equal_payload_shapes_share_serializer(self):
+        data = MockDataProvider.build_base_with_oauth_data()
+        Serializer = DataProvider._get_serializer_for_data(self.filter, data)
+        self.assertEqual(("oauth_config",), Serializer.plan.relation_names)
+        self.assertIs(Serializer, DataProvider._get_serializer_for_data(self.filter, data))
+        self.assertIsNot(Serializer, DataProvider._get_serializer_for_data(
+            self.filter, MockDataProvider.build_base_with_http_data()))
@@ -0,0 +1,66 @@
+import io
+import json
+
+import django
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from generic_serializer import SerializableModelFilter
+from test_app.models import DataProvider, Endpoint
+
+
+class TestSerializableModelExport(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+
+    def setUp(self) -> None:
+        for i in range(5):
+            data_provider = DataProvider.objects.create(provider_name=f"provider{i}")
+            Endpoint.objects.create(data_provider=data_provider, endpoint_name=f"test{i}", endpoint_url="testurl")
+
+    def test_iter_serialize_queryset_equals_serialize_queryset(self):
+        queryset = DataProvider.objects.order_by("provider_name")
+        data = list(DataProvider.iter_serialize_queryset(queryset, self.build_filter(), chunk_size=2))
+        self.assertEqual(DataProvider.serialize_queryset(queryset, self.build_filter()), data)
+
+    def test_iter_serialize_queryset_prefetches_per_chunk(self):
+        queryset = DataProvider.objects.order_by("provider_name")
+        with CaptureQueriesContext(connection) as queries:
+            data = list(DataProvider.iter_serialize_queryset(queryset, self.build_filter(), chunk_size=2))
+        self.assertEqual(len(data), 5)
+        # one prefetch of endpoints per chunk, the root rows are streamed by a single query
+        self.assertEqual(len([q for q in queries if "test_app_endpoint" in q["sql"]]), 3)
+
+    def test_export_ndjson(self):
+        stream = io.StringIO()
+        count = DataProvider.export_ndjson(DataProvider.objects.order_by("provider_name"), stream,
+                                           self.build_filter(), chunk_size=2)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(count, 5)
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0]),
+                         {"provider_name": "provider0", "api_endpoint": None,
+                          "endpoints": [{"endpoint_name": "test0", "endpoint_url": "testurl"}]})
+
+    def test_export_json_array(self):
+        stream = io.StringIO()
+        count = DataProvider.export_json_array(DataProvider.objects.order_by("provider_name"), stream,
+                                               self.build_filter(), chunk_size=2)
+        data = json.loads(stream.getvalue())
+        self.assertEqual(count, 5)
+        self.assertEqual([tree["provider_name"] for tree in data], [f"provider{i}" for i in range(5)])
+
+    def test_export_json_array_empty(self):
+        stream = io.StringIO()
+        count = DataProvider.export_json_array(DataProvider.objects.none(), stream, self.build_filter())
+        self.assertEqual(count, 0)
+        self.assertEqual(json.loads(stream.getvalue()), [])
+
+    @staticmethod
+    def build_filter():
+        return SerializableModelFilter(max_depth=1, exclude_labels=("oauth_config", "http_config"),
+                                       start_object_name="data_provider")
@@ -0,0 +1,112 @@
+import io
+import json
+import mmap
+import tempfile
+
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer.json_utils import JsonUtils
+from test_app.models import DataProvider, Endpoint
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestSerializableModelImport(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def test_iter_json_array(self):
+        data = [{"a": 1, "b": [1, 2.5, "x,]"]}, 123, "æøå", None, [], {"nested": {"c": True}}]
+        text = json.dumps(data, indent=2)
+        self.assertEqual(data, list(JsonUtils.iter_json_array(io.StringIO(text))))
+        self.assertEqual(data, list(JsonUtils.iter_json_array(io.BytesIO(text.encode("utf-8")))))
+
+    def test_iter_json_array_small_reads(self):
+        # reads split values, numbers and multi byte characters
+        data = [{"name": "æøå" * 10, "value": 1234567}, 98765, {"list": list(range(20))}]
+        stream = io.BytesIO(json.dumps(data).encode("utf-8"))
+        original_read_size = JsonUtils.read_size
+        JsonUtils.read_size = 3
+        try:
+            self.assertEqual(data, list(JsonUtils.iter_json_array(stream)))
+        finally:
+            JsonUtils.read_size = original_read_size
+
+    def test_iter_json_array_numbers_split_after_dot_or_exponent(self):
+        text = "[12345.5, 1.5e10, -2E-3, 0.25, 7]"
+        original_read_size = JsonUtils.read_size
+        try:
+            for read_size in range(1, len(text) + 2):
+                JsonUtils.read_size = read_size
+                self.assertEqual([12345.5, 1.5e10, -2E-3, 0.25, 7],
+                                 list(JsonUtils.iter_json_array(io.StringIO(text))), f"read size {read_size}")
+        finally:
+            JsonUtils.read_size = original_read_size
+
+    def test_iter_json_array_empty(self):
+        self.assertEqual([], list(JsonUtils.iter_json_array(io.StringIO(" [ ] "))))
+
+    def test_iter_json_array_invalid(self):
+        with self.assertRaises(ValueError):
+            list(JsonUtils.iter_json_array(io.StringIO('{"a": 1}')))
+        with self.assertRaises(ValueError):
+            list(JsonUtils.iter_json_array(io.StringIO('[{"a": 1}')))
+
+    def test_iter_ndjson_from_mmap(self):
+        data = [{"a": 1}, {"b": "æøå"}]
+        with tempfile.TemporaryFile() as f:
+            f.write("\n".join(json.dumps(element) for element in data).encode("utf-8") + b"\n\n")
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self.assertEqual(data, list(JsonUtils.iter_ndjson(mm)))
+
+    def test_read_json_file(self):
+        data = MockDataProvider.build_full_data()
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as f:
+            json.dump(data, f)
+            f.flush()
+            self.assertEqual(data, JsonUtils.read_json_file(f.name))
+            self.assertEqual([data], list(JsonUtils.iter_json_file(f.name, ndjson=True)))
+
+    def test_import_json_array(self):
+        data = self.build_data(5)
+        count = DataProvider.import_json_array(io.StringIO(json.dumps(data)), self.filter, batch_size=2)
+        self.assertEqual(5, count)
+        self.assertEqual(DataProvider.objects.count(), 5)
+        self.assertEqual(Endpoint.objects.count(), 10)
+
+    def test_import_ndjson(self):
+        data = self.build_data(3)
+        stream = io.StringIO()
+        JsonUtils.write_ndjson(stream, data)
+        stream.seek(0)
+        self.assertEqual(3, DataProvider.import_ndjson(stream, self.filter))
+        self.assertSetEqual({"provider0", "provider1", "provider2"},
+                            set(DataProvider.objects.values_list("provider_name", flat=True)))
+
+    def test_import_round_trip_with_export(self):
+        DataProvider.deserialize_many(self.build_data(4), self.filter)
+        stream = io.StringIO()
+        DataProvider.export_json_array(DataProvider.objects.order_by("pk"), stream, self.filter)
+        DataProvider.objects.all().delete()
+        stream.seek(0)
+        self.assertEqual(4, DataProvider.import_json_array(stream, self.filter))
+        self.assertEqual(DataProvider.objects.count(), 4)
+
+    @staticmethod
+    def build_data(count):
+        data = []
+        for i in range(count):
+            tree = MockDataProvider.build_full_data()
+            tree["provider_name"] = f"provider{i}"
+            data.append(tree)
+        return data
@@ -0,0 +1,96 @@
+import django
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer.json_utils import JsonUtils
+from generic_serializer.serializable_model import OUTPUT_JSON_STR
+from test_app.models import DataProvider, Endpoint, OauthConfig
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestSerializableModelNormalized(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+        cls.endpoint_filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node", "endpoints", "http_config", "oauth_config"),
+            start_object_name="endpoint"
+        )
+
+    def setUp(self):
+        self.data_provider = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+
+    def test_serialize_normalized(self):
+        document = DataProvider.objects.get(pk=self.data_provider.pk).serialize_normalized(self.filter)
+        self.assertEqual(self.data_provider.pk, document["data"])
+        data_provider = document["included"]["test_app.dataprovider"][str(self.data_provider.pk)]
+        self.assertEqual("dsfsd4", data_provider["provider_name"])
+        endpoint_pks = sorted(Endpoint.objects.values_list("pk", flat=True))
+        self.assertListEqual(endpoint_pks, sorted(data_provider["endpoints"]))
+        self.assertSetEqual({str(pk) for pk in endpoint_pks}, set(document["included"]["test_app.endpoint"]))
+        oauth_config = document["included"]["test_app.oauthconfig"][str(data_provider["oauth_config"])]
+        self.assertEqual("123", oauth_config["client_id"])
+
+    def test_shared_objects_are_included_once(self):
+        queryset = Endpoint.objects.order_by("pk")
+        document = Endpoint.serialize_queryset_normalized(queryset, self.endpoint_filter)
+        self.assertListEqual(list(queryset.values_list("pk", flat=True)), document["data"])
+        self.assertListEqual([str(self.data_provider.pk)], list(document["included"]["test_app.dataprovider"]))
+        for endpoint in document["included"]["test_app.endpoint"].values():
+            self.assertEqual(self.data_provider.pk, endpoint["data_provider"])
+        nested = Endpoint.serialize_queryset(queryset, self.endpoint_filter)
+        self.assertDictEqual(nested[0]["data_provider"],
+                             document["included"]["test_app.dataprovider"][str(self.data_provider.pk)])
+
+    def test_deserialize_normalized(self):
+        document = DataProvider.objects.get(pk=self.data_provider.pk).serialize_normalized(self.filter)
+        DataProvider.objects.all().delete()
+        data_provider = DataProvider.deserialize_normalized(JsonUtils.loads(JsonUtils.dumps(document)), self.filter)
+        self.assertEqual("dsfsd4", data_provider.provider_name)
+        self.assertEqual(2, data_provider.endpoints.count())
+        self.assertEqual("123", OauthConfig.objects.get().client_id)
+        self.assertDictEqual(MockDataProvider.build_full_data()["http_config"],
+                             self.strip(data_provider.serialize(self.filter)["http_config"]))
+
+    def test_deserialize_shared_object_once(self):
+        document = Endpoint.serialize_queryset_normalized(Endpoint.objects.order_by("pk"), self.endpoint_filter,
+                                                          OUTPUT_JSON_STR)
+        DataProvider.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            endpoints = Endpoint.deserialize_normalized(JsonUtils.loads(document), self.endpoint_filter)
+        self.assertEqual(2, len(endpoints))
+        self.assertEqual(1, DataProvider.objects.count())
+        self.assertEqual({DataProvider.objects.get().pk}, {endpoint.data_provider_id for endpoint in endpoints})
+        # the data provider both endpoints point at is checked and inserted once
+        table = DataProvider._meta.db_table
+        self.assertEqual(1, len([query for query in queries if query["sql"].startswith(f'INSERT INTO "{table}"')]))
+        self.assertEqual(1, len([query for query in queries if query["sql"].startswith("SELECT")
+                                 and f'FROM "{table}"' in query["sql"]]))
+
+    def test_deserialize_upsert(self):
+        document = Endpoint.serialize_queryset_normalized(Endpoint.objects.order_by("pk"), self.endpoint_filter)
+        document["included"]["test_app.endpoint"][str(document["data"][0])]["endpoint_url"] = "changed"
+        Endpoint.deserialize_normalized(document, self.endpoint_filter, upsert=True)
+        self.assertEqual(1, DataProvider.objects.count())
+        self.assertEqual(2, Endpoint.objects.count())
+        self.assertEqual("changed", Endpoint.objects.get(pk=document["data"][0]).endpoint_url)
+
+    def test_unresolved_reference(self):
+        document = {"data": 1, "included": {"test_app.dataprovider": {}}}
+        with self.assertRaises(ValidationError):
+            DataProvider.deserialize_normalized(document, self.filter)
+
+    @staticmethod
+    def strip(data):
+        return {key: value for key, value in data.items() if value is not None}
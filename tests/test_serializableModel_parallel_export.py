@@ -0,0 +1,116 @@
+import io
+import json
+import os
+import tempfile
+
+import django
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer import parallel_export
+from generic_serializer.parallel_export import get_pk_ranges
+from test_app.models import DataProvider
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestSerializableModelParallelExport(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def setUp(self):
+        data = []
+        for i in range(7):
+            tree = MockDataProvider.build_full_data()
+            tree["provider_name"] = f"provider{i}"
+            data.append(tree)
+        DataProvider.deserialize_many(data, self.filter)
+        self.expected = DataProvider.serialize_queryset(DataProvider.objects.order_by("pk"), self.filter)
+
+    def test_get_pk_ranges(self):
+        pks = list(DataProvider.objects.order_by("pk").values_list("pk", flat=True))
+        self.assertEqual([(pks[0], pks[3]), (pks[3], pks[6]), (pks[6], None)],
+                         get_pk_ranges(DataProvider.objects.all(), 3))
+        self.assertEqual([], get_pk_ranges(DataProvider.objects.none(), 3))
+        # a count and a single pass over the primary keys, however many partitions
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(7, len(get_pk_ranges(DataProvider.objects.all(), 7)))
+        self.assertEqual(2, len(queries))
+
+    def test_export_shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            shards = DataProvider.export_shards(DataProvider.objects.all(), directory, self.filter, workers=1,
+                                                partitions=3)
+            self.assertEqual([3, 3, 1], [count for _, count in shards])
+            data = []
+            for path, _ in shards:
+                self.assertEqual(directory, os.path.dirname(path))
+                with open(path) as f:
+                    data += [json.loads(line) for line in f]
+        self.assertEqual(self.expected, data)
+
+    def test_export_parallel_ndjson(self):
+        stream = io.StringIO()
+        count = DataProvider.export_parallel(DataProvider.objects.all(), stream, self.filter, workers=1, partitions=4)
+        self.assertEqual(7, count)
+        self.assertEqual(self.expected, [json.loads(line) for line in stream.getvalue().splitlines()])
+
+    def test_export_parallel_json_array(self):
+        stream = io.StringIO()
+        count = DataProvider.export_parallel(DataProvider.objects.filter(provider_name__in=["provider1", "provider5"]),
+                                             stream, self.filter, workers=1, partitions=4, ndjson=False)
+        self.assertEqual(2, count)
+        self.assertEqual([self.expected[1], self.expected[5]], json.loads(stream.getvalue()))
+
+    def test_default_chunk_size(self):
+        stream = io.StringIO()
+        self.assertEqual(7, parallel_export.export_parallel(DataProvider, DataProvider.objects.all(), stream,
+                                                            self.filter, workers=1))
+
+
+class TestSerializableModelParallelExportProcesses(TransactionTestCase):
+    # worker processes can't open an in memory test database, so the pool runs against a database in a file. the
+    # alias is not in the settings, the workers only know it from the connection of the queryset
+    ALIAS = "parallel_export"
+    databases = {"default", ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.databases[cls.ALIAS] = {"ENGINE": "django.db.backends.sqlite3",
+                                            "NAME": os.path.join(cls.directory.name, "db.sqlite3")}
+        super().setUpClass()
+        django.setup()
+        call_command("migrate", database=cls.ALIAS, verbosity=0)
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[cls.ALIAS].close()
+        del connections[cls.ALIAS]
+        del connections.databases[cls.ALIAS]
+        cls.directory.cleanup()
+
+    def test_export_parallel_processes(self):
+        for i in range(7):
+            DataProvider.objects.using(self.ALIAS).create(provider_name=f"provider{i}", api_endpoint=str(i))
+        expected = DataProvider.serialize_queryset(DataProvider.objects.using(self.ALIAS).order_by("pk"), self.filter)
+        stream = io.StringIO()
+        count = DataProvider.export_parallel(DataProvider.objects.using(self.ALIAS), stream, self.filter, workers=2)
+        self.assertEqual(7, count)
+        self.assertEqual(expected, [json.loads(line) for line in stream.getvalue().splitlines()])
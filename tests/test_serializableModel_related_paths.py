@@ -0,0 +1,70 @@
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter
+from test_app.models import DataProvider, Endpoint, OauthConfig, TestModel1, TestModel2, TestModel3
+
+
+class TestSerializableModelRelatedPaths(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+
+    def test_reverse_relations_paths(self):
+        Serializer = DataProvider._build_serializer(self.build_filter(max_depth=1))
+        self.assertSetEqual({"http_config", "oauth_config"}, set(Serializer.select_related_paths))
+        self.assertSetEqual({"endpoints"}, set(Serializer.prefetch_related_paths))
+
+    def test_depth_0_has_no_paths(self):
+        Serializer = DataProvider._build_serializer(self.build_filter(max_depth=0))
+        self.assertEqual((), Serializer.select_related_paths)
+        self.assertEqual((), Serializer.prefetch_related_paths)
+
+    def test_excluded_relations_have_no_paths(self):
+        Serializer = DataProvider._build_serializer(
+            self.build_filter(max_depth=1, exclude_labels=("endpoints", "oauth_config")))
+        self.assertEqual(("http_config",), Serializer.select_related_paths)
+        self.assertEqual((), Serializer.prefetch_related_paths)
+
+    def test_forward_foreign_key_chain_is_selected(self):
+        Serializer = TestModel1._build_serializer(
+            SerializableModelFilter(max_depth=2, start_object_name="test_model1"))
+        self.assertSetEqual({"test_model2", "test_model2__test_model3"}, set(Serializer.select_related_paths))
+        self.assertEqual((), Serializer.prefetch_related_paths)
+
+    def test_forward_foreign_key_is_not_many(self):
+        self.assertFalse(TestModel2._is_related_object_many("test_model3"))
+        self.assertTrue(DataProvider._is_related_object_many("endpoints"))
+        self.assertFalse(DataProvider._is_related_object_many("http_config"))
+
+    def test_optimized_queryset_query_count_is_constant(self):
+        for i in range(5):
+            data_provider = DataProvider.objects.create(provider_name=f"provider{i}")
+            Endpoint.objects.create(data_provider=data_provider, endpoint_name="a", endpoint_url="a")
+            Endpoint.objects.create(data_provider=data_provider, endpoint_name="b", endpoint_url="b")
+            OauthConfig.objects.create(data_provider=data_provider, scope=[])
+        filter = self.build_filter(max_depth=1)
+        Serializer = DataProvider._get_serializer(filter)
+        queryset = DataProvider.optimize_queryset(DataProvider.objects.all(), filter)
+        with self.assertNumQueries(2):
+            data = Serializer(queryset, many=True).data
+        self.assertEqual(len(data), 5)
+        self.assertEqual(len(data[0]["endpoints"]), 2)
+        self.assertIsNone(data[0]["http_config"])
+
+    def test_prefetch_instance(self):
+        obj3 = TestModel3.objects.create(text="dummy")
+        obj2 = TestModel2.objects.create(text="dummy", test_model3=obj3)
+        obj1 = TestModel1.objects.get(pk=TestModel1.objects.create(text="dummy", test_model2=obj2).pk)
+        Serializer = TestModel1._build_serializer(SerializableModelFilter(max_depth=2, start_object_name="test_model1"))
+        TestModel1._prefetch_instances([obj1], Serializer)
+        with self.assertNumQueries(0):
+            data = Serializer(obj1).data
+        self.assertEqual(data["test_model2"]["test_model3"]["text"], "dummy")
+
+    @staticmethod
+    def build_filter(max_depth, exclude_labels=()):
+        return SerializableModelFilter(max_depth=max_depth, exclude_labels=exclude_labels,
+                                       start_object_name="data_provider")
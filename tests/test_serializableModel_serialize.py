@@ -1,8 +1,11 @@
+import json
+from collections import OrderedDict
+
 import django
 from django.test import TransactionTestCase
 
 from generic_serializer import SerializableModelFilter
-from test_app.models import DataProvider, OauthConfig
+from test_app.models import DataProvider, Endpoint, OauthConfig, HttpConfig
 from tests.mock_data_provider import MockDataProvider
 
 
@@ -58,3 +61,46 @@ class TestSerializableModelSerialize(TransactionTestCase):
             {'endpoint_name': 'test2', 'endpoint_url': 'testurl', 'api_type': 'OauthGraphql', 'request_type': 'GET'}],
                     'http_config': None, 'oauth_config': None}
         self.assertEqual(expected, data)
+
+    def test_serializing_native_output_is_plain_dicts(self):
+        data_provider = MockDataProvider.create_data_provider_with_endpoints()
+        HttpConfig.objects.create(data_provider=data_provider, header={"nested": {"key": "value"}, "list": [{}]})
+        # reloaded, so the json field is loaded with its object_pairs_hook
+        data_provider = self.model.objects.get(pk=data_provider.pk)
+        self.assertIs(type(data_provider.http_config.header), OrderedDict)
+        data = data_provider.serialize(
+            filter=SerializableModelFilter(max_depth=1, exclude_labels=self.exclude_labels,
+                                           start_object_name=self.data_provider_name))
+        self.assertIs(type(data), dict)
+        self.assertIs(type(data["endpoints"]), list)
+        self.assertIs(type(data["endpoints"][0]), dict)
+        header = data["http_config"]["header"]
+        self.assertIs(type(header), dict)
+        self.assertIs(type(header["nested"]), dict)
+        self.assertIs(type(header["list"][0]), dict)
+
+    def test_serializing_json_output(self):
+        data_provider = self.model.objects.create(provider_name="dsfsd4")
+        filter = SerializableModelFilter(max_depth=0)
+        text = data_provider.serialize(filter=filter, output="json_str")
+        self.assertIsInstance(text, str)
+        self.assertNotIn(" ", text)
+        self.assertEqual({"provider_name": "dsfsd4", "api_endpoint": None}, json.loads(text))
+        self.assertEqual(text.encode("utf-8"), data_provider.serialize(filter=filter, output="json_bytes"))
+
+    def test_serializing_unknown_output(self):
+        data_provider = self.model.objects.create(provider_name="dsfsd4")
+        with self.assertRaises(ValueError):
+            data_provider.serialize(filter=SerializableModelFilter(max_depth=0), output="xml")
+
+    def test_serializing_same_instance_after_change(self):
+        data_provider = self.model.objects.create(provider_name="dsfsd4")
+        filter = SerializableModelFilter(max_depth=1, exclude_labels=self.exclude_labels,
+                                         start_object_name=self.data_provider_name)
+        self.assertEqual([], data_provider.serialize(filter)["endpoints"])
+        self.assertEqual({}, data_provider.serialize_normalized(filter)["included"].get("test_app.endpoint", {}))
+        Endpoint.objects.create(data_provider=data_provider, endpoint_name="test1", endpoint_url="testurl")
+        endpoints = data_provider.serialize(filter)["endpoints"]
+        self.assertEqual(["test1"], [endpoint["endpoint_name"] for endpoint in endpoints])
+        self.assertEqual(1, len(data_provider.serialize_normalized(filter)["included"]["test_app.endpoint"]))
+        self.assertFalse(hasattr(data_provider, "_prefetched_objects_cache"))
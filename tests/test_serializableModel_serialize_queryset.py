@@ -0,0 +1,58 @@
+import django
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from generic_serializer import SerializableModelFilter
+from test_app.models import DataProvider, Endpoint, HttpConfig
+
+
+class TestSerializableModelSerializeQueryset(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+
+    def test_serialize_queryset(self):
+        self.create_data_providers(2)
+        data = DataProvider.serialize_queryset(DataProvider.objects.order_by("provider_name"), self.build_filter())
+        expected = [
+            {'provider_name': 'provider0', 'api_endpoint': None, 'oauth_config': None,
+             'http_config': {'header': {'a': 1}, 'url_encoded_params': None},
+             'endpoints': [{'endpoint_name': 'test0', 'endpoint_url': 'testurl'}]},
+            {'provider_name': 'provider1', 'api_endpoint': None, 'oauth_config': None,
+             'http_config': {'header': {'a': 1}, 'url_encoded_params': None},
+             'endpoints': [{'endpoint_name': 'test0', 'endpoint_url': 'testurl'}]}
+        ]
+        self.assertEqual(expected, data)
+
+    def test_serialize_queryset_equals_serialize(self):
+        self.create_data_providers(3)
+        queryset = DataProvider.objects.order_by("provider_name")
+        data = DataProvider.serialize_queryset(queryset, self.build_filter())
+        self.assertEqual([obj.serialize(self.build_filter()) for obj in queryset], data)
+
+    def test_query_count_is_independent_of_row_count(self):
+        self.create_data_providers(2)
+        with CaptureQueriesContext(connection) as small:
+            DataProvider.serialize_queryset(DataProvider.objects.all(), self.build_filter())
+        self.create_data_providers(10, offset=2)
+        with CaptureQueriesContext(connection) as large:
+            data = DataProvider.serialize_queryset(DataProvider.objects.all(), self.build_filter())
+        self.assertEqual(len(data), 12)
+        self.assertEqual(len(small), len(large))
+
+    @staticmethod
+    def create_data_providers(count, offset=0):
+        for i in range(offset, offset + count):
+            data_provider = DataProvider.objects.create(provider_name=f"provider{i}")
+            HttpConfig.objects.create(data_provider=data_provider, header={"a": 1})
+            Endpoint.objects.create(data_provider=data_provider, endpoint_name="test0", endpoint_url="testurl")
+
+    @staticmethod
+    def build_filter():
+        return SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("body_type", "body_content", "request_type"),
+            start_object_name="data_provider")
@@ -0,0 +1,104 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import django
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer.json_utils import JsonUtils
+from generic_serializer.table_export import PARQUET, pyarrow
+from test_app.models import DataProvider, Endpoint, TestModel1, TestModel2, TestModel3
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestSerializableModelTableExport(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_export_csv(self):
+        data_provider = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        tables = DataProvider.export_tables(DataProvider.objects.all(), self.directory.name, self.filter)
+        self.assertSetEqual({"dataprovider", "endpoints", "http_config", "oauth_config"}, set(tables))
+        path, count = tables["endpoints"]
+        self.assertEqual(2, count)
+        rows = self.read_csv(path)
+        self.assertSetEqual({str(data_provider.pk)}, {row["data_provider_id"] for row in rows})
+        self.assertSetEqual(set(Endpoint.objects.values_list("endpoint_name", flat=True)),
+                            {row["endpoint_name"] for row in rows})
+        http_config, = self.read_csv(tables["http_config"][0])
+        self.assertDictEqual(MockDataProvider.build_http_data()["http_config"]["header"],
+                             JsonUtils.loads(http_config["header"]))
+
+    def test_forward_relations_written_once(self):
+        model3 = TestModel3.objects.create(text="model3")
+        model2 = TestModel2.objects.create(text="model2", test_model3=model3)
+        for index in range(3):
+            TestModel1.objects.create(text=f"model1 {index}", test_model2=model2)
+        filter = SerializableModelFilter(max_depth=2, start_object_name="test_model1")
+        with CaptureQueriesContext(connection) as queries:
+            tables = TestModel1.export_tables(TestModel1.objects.all(), self.directory.name, filter, chunk_size=2)
+        # one query per table, the second chunk of roots only points at objects that are already written
+        self.assertEqual(3, len(queries))
+        self.assertEqual(3, tables["testmodel1"][1])
+        model2_row, = self.read_csv(tables["test_model2"][0])
+        self.assertEqual(str(model3.pk), model2_row["test_model3_id"])
+        self.assertEqual(1, tables["test_model2.test_model3"][1])
+        self.assertSetEqual({str(model2.pk)}, {row["test_model2_id"] for row in
+                                               self.read_csv(tables["testmodel1"][0])})
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            DataProvider.export_tables(DataProvider.objects.all(), self.directory.name, self.filter, "xlsx")
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_export_parquet(self):
+        DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        tables = DataProvider.export_tables(DataProvider.objects.all(), self.directory.name, self.filter, PARQUET)
+        path, count = tables["endpoints"]
+        table = pyarrow.parquet.read_table(path)
+        self.assertEqual(count, table.num_rows)
+        self.assertEqual(pyarrow.int64(), table.schema.field("data_provider_id").type)
+        http_config = pyarrow.parquet.read_table(tables["http_config"][0]).to_pylist()[0]
+        self.assertDictEqual(MockDataProvider.build_http_data()["http_config"]["header"],
+                             JsonUtils.loads(http_config["header"]))
+
+    @unittest.skipUnless(pyarrow, "pyarrow is not installed")
+    def test_export_parquet_in_chunks(self):
+        for index in range(5):
+            DataProvider.objects.create(provider_name=f"provider{index}",
+                                        api_endpoint=None if index < 2 else f"endpoint{index}")
+        filter = SerializableModelFilter(max_depth=0, start_object_name="data_provider")
+        tables = DataProvider.export_tables(DataProvider.objects.order_by("pk"), self.directory.name, filter, PARQUET,
+                                            chunk_size=2)
+        parquet_file = pyarrow.parquet.ParquetFile(tables["dataprovider"][0])
+        # a row group per chunk, the first one only holds nulls in the api_endpoint column
+        self.assertEqual(3, parquet_file.metadata.num_row_groups)
+        self.assertEqual([None, None, "endpoint2", "endpoint3", "endpoint4"],
+                         parquet_file.read().column("api_endpoint").to_pylist())
+
+    def test_files_in_directory(self):
+        DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        tables = DataProvider.export_tables(DataProvider.objects.all(), self.directory.name, self.filter)
+        self.assertSetEqual({os.path.basename(path) for path, _ in tables.values()},
+                            set(os.listdir(self.directory.name)))
+
+    @staticmethod
+    def read_csv(path) -> list:
+        with open(path, encoding=JsonUtils.encoding, newline="") as f:
+            return list(csv.DictReader(f))
@@ -0,0 +1,99 @@
+import django
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from generic_serializer import SerializableModelFilter
+from test_app.models import DataProvider, Endpoint, OauthConfig, HttpConfig
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestSerializableModelUpsert(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def test_natural_key_fields(self):
+        self.assertEqual(("provider_name",), DataProvider._get_natural_key_fields())
+        self.assertEqual(("data_provider",), OauthConfig._get_natural_key_fields())
+        self.assertEqual(("data_provider", "endpoint_name"), Endpoint._get_natural_key_fields())
+
+    def test_reimport_without_upsert_fails(self):
+        DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        with self.assertRaises(ValidationError):
+            DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+
+    def test_upsert_creates_missing(self):
+        dp = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter, upsert=True)
+        self.assertEqual(dp.endpoints.count(), 2)
+        self.assertEqual(dp.oauth_config.client_id, "123")
+
+    def test_upsert_identical_writes_nothing(self):
+        original = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        with CaptureQueriesContext(connection) as queries:
+            dp = DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter, upsert=True)
+        writes = [q for q in queries if q["sql"].startswith(("INSERT", "UPDATE"))]
+        self.assertEqual(writes, [])
+        self.assertEqual(dp.pk, original.pk)
+        self.assertEqual(DataProvider.objects.count(), 1)
+        self.assertEqual(Endpoint.objects.count(), 2)
+        self.assertEqual(OauthConfig.objects.count(), 1)
+        self.assertEqual(HttpConfig.objects.count(), 1)
+
+    def test_upsert_updates_changed_fields_only(self):
+        DataProvider.deserialize(MockDataProvider.build_full_data(), self.filter)
+        data = MockDataProvider.build_full_data()
+        data["api_endpoint"] = "changed"
+        data["oauth_config"]["client_id"] = "456"
+        data["endpoints"][0]["endpoint_url"] = "changedurl"
+        data["endpoints"].append({'endpoint_name': 'test3', 'endpoint_url': 'testurl'})
+        with CaptureQueriesContext(connection) as queries:
+            dp = DataProvider.deserialize(data, self.filter, upsert=True)
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 3)
+        self.assertTrue(all("client_secret" not in sql and "endpoint_name" not in sql for sql in updates))
+        dp = DataProvider.objects.get(pk=dp.pk)
+        self.assertEqual(dp.api_endpoint, "changed")
+        self.assertEqual(dp.oauth_config.client_id, "456")
+        self.assertEqual(dp.endpoints.get(endpoint_name="test1").endpoint_url, "changedurl")
+        self.assertEqual(dp.endpoints.count(), 3)
+        self.assertEqual(OauthConfig.objects.count(), 1)
+
+    def test_upsert_many_one_query_per_level(self):
+        data = [self.build_tree(i) for i in range(10)]
+        DataProvider.deserialize_many(data[:5], self.filter)
+        with CaptureQueriesContext(connection) as queries:
+            DataProvider.deserialize_many(data, self.filter, upsert=True)
+        provider_selects = [q for q in queries if q["sql"].startswith('SELECT "test_app_dataprovider"')]
+        endpoint_selects = [q for q in queries if q["sql"].startswith('SELECT "test_app_endpoint"')]
+        self.assertEqual(len(provider_selects), 1)
+        self.assertEqual(len(endpoint_selects), 1)
+        self.assertEqual(DataProvider.objects.count(), 10)
+        self.assertEqual(Endpoint.objects.count(), 20)
+
+    @staticmethod
+    def build_tree(i):
+        tree = MockDataProvider.build_base_with_endpoints_data()
+        tree["provider_name"] = f"provider{i}"
+        return tree
+
+    def test_upsert_repeated_natural_key_in_batch(self):
+        data = MockDataProvider.build_full_data()
+        changed = MockDataProvider.build_full_data()
+        changed["endpoints"][0]["endpoint_url"] = "changed"
+        first, second = DataProvider.deserialize_many([data, changed], self.filter, upsert=True)
+        self.assertIs(first, second)
+        self.assertEqual(1, DataProvider.objects.count())
+        self.assertEqual(2, Endpoint.objects.count())
+        self.assertEqual("changed", Endpoint.objects.get(endpoint_name="test1").endpoint_url)
+        DataProvider.deserialize_many([data, data], self.filter, upsert=True)
+        self.assertEqual(1, DataProvider.objects.count())
+        self.assertEqual(2, Endpoint.objects.count())
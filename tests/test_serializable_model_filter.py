@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer.serializable_model import default_filter
+from test_app.models import DataProvider, TestModel3
+
+
+class TestSerializableModelFilter(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+
+    def test_filter_is_immutable(self):
+        filter = SerializableModelFilter(max_depth=1, start_object_name="data_provider")
+        with self.assertRaises(AttributeError):
+            filter.max_depth = 2
+        with self.assertRaises(AttributeError):
+            filter.start_object_name = "endpoint"
+
+    def test_serialize_does_not_change_default_filter(self):
+        TestModel3.objects.create(text="dummy").serialize()
+        self.assertIsNone(default_filter.start_object_name)
+        self.assertEqual(default_filter.signature(), SerializableModelFilter().signature())
+
+    def test_start_creates_independent_contexts(self):
+        filter = SerializableModelFilter(max_depth=2, start_object_name="data_provider")
+        context = filter.start()
+        context.step_into("endpoints")
+        other = filter.start()
+        self.assertEqual(context.current_depth, 1)
+        self.assertEqual(other.current_depth, 0)
+        self.assertEqual(other.current_object_name, "data_provider")
+
+    def test_concurrent_serializer_builds(self):
+        filters = [SerializableModelFilter(max_depth=depth % 2, exclude_labels=("oauth_config",),
+                                           start_object_name="data_provider") for depth in range(40)]
+        shared_filter = SerializableModelFilter(max_depth=1, start_object_name="data_provider")
+
+        def build(filter):
+            return DataProvider._build_serializer(filter), DataProvider._build_serializer(shared_filter)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(build, filters))
+        for filter, (serializer, shared_serializer) in zip(filters, results):
+            expected = {"endpoints", "http_config"} if filter.max_depth else set()
+            self.assertSetEqual(expected, set(serializer.Meta.fields) - {"provider_name", "api_endpoint"})
+            self.assertSetEqual({"provider_name", "api_endpoint", "endpoints", "http_config", "oauth_config"},
+                                set(shared_serializer.Meta.fields))
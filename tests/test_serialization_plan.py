@@ -0,0 +1,72 @@
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer.serialization_plan import SerializationPlan
+from test_app.models import DataProvider, Endpoint, TestModel1
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestSerializationPlan(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+
+    def test_compile(self):
+        plan = SerializationPlan.compile(DataProvider, self.build_filter(max_depth=1))
+        self.assertEqual(("provider_name", "api_endpoint"), plan.fields)
+        self.assertSetEqual({"endpoints", "http_config", "oauth_config"}, set(plan.relation_names))
+        endpoints = plan.get_relation("endpoints")
+        self.assertTrue(endpoints.many)
+        self.assertEqual(("endpoints",), endpoints.plan.path)
+        self.assertEqual((), endpoints.plan.relations)
+        http_config = plan.get_relation("http_config").plan
+        self.assertEqual(("header", "url_encoded_params"), tuple(name for name, _ in http_config.custom_fields))
+
+    def test_plan_is_hashable_and_reusable(self):
+        plan = SerializationPlan.compile(DataProvider, self.build_filter(max_depth=2))
+        same = SerializationPlan.compile(DataProvider, self.build_filter(max_depth=2))
+        self.assertEqual(plan, same)
+        self.assertEqual(hash(plan), hash(same))
+        self.assertIs(DataProvider._get_plan(self.build_filter(max_depth=2)),
+                      DataProvider._get_plan(self.build_filter(max_depth=2)))
+
+    def test_dotted_field_exclude_only_applies_at_path(self):
+        plan = SerializationPlan.compile(DataProvider, self.build_filter(
+            max_depth=1, exclude_labels=("endpoints.endpoint_url", "http_config.request_type")))
+        self.assertNotIn("endpoint_url", plan.get_relation("endpoints").plan.fields)
+        self.assertNotIn("request_type", plan.get_relation("http_config").plan.fields)
+        self.assertIn("endpoint_name", plan.get_relation("endpoints").plan.fields)
+
+    def test_dotted_relation_exclude_only_applies_at_path(self):
+        filter = SerializableModelFilter(max_depth=3, exclude_labels=("test_model2.test_model3",),
+                                         start_object_name="test_model1")
+        plan = SerializationPlan.compile(TestModel1, filter)
+        self.assertEqual((), plan.get_relation("test_model2").plan.relations)
+
+    def test_include_paths(self):
+        plan = SerializationPlan.compile(DataProvider, self.build_filter(max_depth=2, include_paths=("endpoints",)))
+        self.assertEqual(("endpoints",), plan.relation_names)
+        self.assertEqual(("provider_name", "api_endpoint"), plan.fields)
+        self.assertEqual(("endpoints",), plan.prefetch_related_paths)
+
+    def test_relation_back_to_parent_is_not_walked(self):
+        filter = SerializableModelFilter(max_depth=2, start_object_name="endpoint")
+        plan = SerializationPlan.compile(Endpoint, filter)
+        data_provider = plan.get_relation("data_provider").plan
+        self.assertSetEqual({"http_config", "oauth_config"}, set(data_provider.relation_names))
+        self.assertEqual(("data_provider",), plan.select_related_paths[:1])
+
+    def test_serialize_with_dotted_exclude(self):
+        DataProvider.deserialize(MockDataProvider.build_full_data(), self.build_filter(max_depth=1))
+        data = DataProvider.objects.get().serialize(self.build_filter(
+            max_depth=1, exclude_labels=("endpoints.endpoint_url", "oauth_config", "http_config")))
+        self.assertEqual({"provider_name": "dsfsd4", "api_endpoint": "56", "endpoints": [
+            {"endpoint_name": "test1"}, {"endpoint_name": "test2"}]}, data)
+
+    @staticmethod
+    def build_filter(max_depth, exclude_labels=(), include_paths=()):
+        return SerializableModelFilter(max_depth=max_depth, exclude_labels=exclude_labels,
+                                       start_object_name="data_provider", include_paths=include_paths)
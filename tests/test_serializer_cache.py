@@ -0,0 +1,61 @@
+import django
+from django.test import TransactionTestCase
+
+from generic_serializer import SerializableModelFilter, serializer_cache
+from generic_serializer.serializer_cache import SerializerCache
+from test_app.models import DataProvider, HttpConfig
+
+
+class TestSerializerCache(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+
+    def setUp(self) -> None:
+        serializer_cache.clear()
+
+    def test_same_filter_reuses_serializer(self):
+        first = DataProvider._get_serializer(self.build_filter())
+        second = DataProvider._get_serializer(self.build_filter())
+        self.assertIs(first, second)
+        self.assertEqual(serializer_cache.stats()["hits"], 1)
+        self.assertEqual(serializer_cache.stats()["misses"], 1)
+
+    def test_different_filter_builds_new_serializer(self):
+        first = DataProvider._get_serializer(self.build_filter(max_depth=0))
+        second = DataProvider._get_serializer(self.build_filter(max_depth=1))
+        self.assertIsNot(first, second)
+        self.assertEqual(serializer_cache.stats()["misses"], 2)
+
+    def test_exclude_label_order_does_not_matter(self):
+        first = DataProvider._get_serializer(self.build_filter(exclude_labels=("endpoints", "http_config")))
+        second = DataProvider._get_serializer(self.build_filter(exclude_labels=("http_config", "endpoints")))
+        self.assertIs(first, second)
+
+    def test_same_filter_different_model(self):
+        first = DataProvider._get_serializer(self.build_filter())
+        second = HttpConfig._get_serializer(self.build_filter())
+        self.assertIsNot(first, second)
+
+    def test_lru_eviction(self):
+        cache = SerializerCache(max_size=2)
+        cache.get_or_build("a", lambda: 1)
+        cache.get_or_build("b", lambda: 2)
+        cache.get_or_build("a", lambda: 1)
+        cache.get_or_build("c", lambda: 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_clear(self):
+        DataProvider._get_serializer(self.build_filter())
+        serializer_cache.clear()
+        self.assertEqual(len(serializer_cache), 0)
+        self.assertEqual(serializer_cache.stats()["misses"], 0)
+
+    @staticmethod
+    def build_filter(max_depth=1, exclude_labels=()):
+        return SerializableModelFilter(max_depth=max_depth, exclude_labels=exclude_labels,
+                                       start_object_name="data_provider")
@@ -0,0 +1,147 @@
+import copy
+import json
+
+import django
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer.json_utils import JsonUtils
+from generic_serializer.tree_diff import diff_trees, apply_patch, get_identity_keys, get_changed_subtrees, \
+    get_relation_paths, PatchOperation, ADD, REMOVE, CHANGE
+from test_app.models import DataProvider, Endpoint, HttpConfig
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestTreeDiff(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+        cls.filter = SerializableModelFilter(
+            max_depth=1,
+            exclude_labels=("dataprovideruser", "data_provider_node"),
+            start_object_name="data_provider"
+        )
+
+    def setUp(self):
+        self.identity_keys = get_identity_keys(DataProvider._get_plan(self.filter))
+        self.old = self.build_data(3)
+        self.new = copy.deepcopy(self.old)
+
+    def test_identity_keys(self):
+        self.assertEqual({(): ("provider_name",), ("endpoints",): ("endpoint_name",)}, self.identity_keys)
+
+    def test_equal_trees(self):
+        self.assertEqual([], diff_trees(self.old, self.new, self.identity_keys))
+
+    def test_list_children_matched_by_identity(self):
+        self.new[1]["endpoints"].reverse()
+        self.new[1]["endpoints"][0]["endpoint_url"] = "changed"
+        self.assertEqual([PatchOperation(CHANGE, (("provider1",), "endpoints", ("test2",), "endpoint_url"), "changed")],
+                         diff_trees(self.old, self.new, self.identity_keys))
+
+    def test_added_and_removed(self):
+        del self.new[0]["oauth_config"]
+        self.new[2]["endpoints"].pop(0)
+        self.new[2]["endpoints"].append({"endpoint_name": "test3", "endpoint_url": "url"})
+        self.new.append(self.build_data(4)[3])
+        self.assertEqual([
+            PatchOperation(REMOVE, (("provider0",), "oauth_config"), None),
+            PatchOperation(REMOVE, (("provider2",), "endpoints", ("test1",)), None),
+            PatchOperation(ADD, (("provider2",), "endpoints", ("test3",)), {"endpoint_name": "test3",
+                                                                           "endpoint_url": "url"}),
+            PatchOperation(ADD, (("provider3",),), self.new[3]),
+        ], diff_trees(self.old, self.new, self.identity_keys))
+
+    def test_lists_without_identity_keys(self):
+        old = {"scope": ["a", "b"], "nested": [{"x": 1}, {"x": 2}]}
+        new = {"scope": ["b", "a", "c"], "nested": [{"x": 2}]}
+        patch = diff_trees(old, new)
+        self.assertEqual([PatchOperation(CHANGE, ("scope",), new["scope"]),
+                          PatchOperation(CHANGE, ("nested",), new["nested"])], patch)
+        self.assertEqual(new, apply_patch(old, patch))
+
+    def test_lists_without_identity_keys_reordered(self):
+        for old, new in ((["a", "b"], ["b", "a"]), ([1, 2, 3], [3, 2, 1, 4])):
+            patch = diff_trees({"scope": old}, {"scope": new})
+            self.assertEqual([PatchOperation(CHANGE, ("scope",), new)], patch)
+            self.assertEqual({"scope": new}, apply_patch({"scope": old}, patch))
+
+    def test_lists_without_identity_keys_duplicates(self):
+        for old, new in ((["a", "a"], ["a"]), (["a"], ["a", "a"])):
+            patch = diff_trees({"scope": old}, {"scope": new})
+            self.assertEqual({"scope": new}, apply_patch({"scope": old}, patch))
+        self.new[0]["http_config"]["header"]["scope"] = ["a", "a"]
+        old = copy.deepcopy(self.new)
+        self.new[0]["http_config"]["header"]["scope"] = ["a"]
+        self.assertEqual(self.new, apply_patch(old, diff_trees(old, self.new, self.identity_keys), self.identity_keys))
+
+    def test_duplicate_identities(self):
+        self.new[1]["endpoints"][1]["endpoint_name"] = "test1"
+        with self.assertRaises(ValueError):
+            diff_trees(self.old, self.new, self.identity_keys)
+        with self.assertRaises(ValueError):
+            diff_trees(self.new, self.old, self.identity_keys)
+        patch = [PatchOperation(CHANGE, (("provider1",), "endpoints", ("test1",), "endpoint_url"), "changed")]
+        with self.assertRaises(ValueError):
+            apply_patch(self.new, patch, self.identity_keys)
+
+    def test_apply_patch(self):
+        self.new[0]["http_config"]["header"]["X-Auth-Token"] = "changed"
+        self.new[1]["endpoints"][1]["endpoint_url"] = "changed"
+        self.new[2]["endpoints"].pop(0)
+        self.new[2]["endpoints"].append({"endpoint_name": "test3", "endpoint_url": "url"})
+        del self.new[0]["api_endpoint"]
+        patch = diff_trees(self.old, self.new, self.identity_keys)
+        patched = apply_patch(self.old, patch, self.identity_keys)
+        self.assertEqual(JsonUtils.fingerprint(self.new), JsonUtils.fingerprint(patched))
+        self.assertEqual(self.build_data(3), self.old)
+
+    def test_apply_patch_from_json(self):
+        self.new[1]["endpoints"][1]["endpoint_url"] = "changed"
+        patch = json.loads(json.dumps(diff_trees(self.old, self.new, self.identity_keys)))
+        self.assertEqual(self.new, apply_patch(self.old, patch, self.identity_keys))
+
+    def test_changed_subtrees(self):
+        self.new[1]["endpoints"][1]["endpoint_url"] = "changed"
+        self.new[2]["http_config"]["header"]["X-Auth-Token"] = "changed"
+        patch = diff_trees(self.old, self.new, self.identity_keys)
+        changed = get_changed_subtrees(self.new, patch, self.identity_keys,
+                                       get_relation_paths(DataProvider._get_plan(self.filter)))
+        self.assertEqual([
+            {"provider_name": "provider1", "api_endpoint": "56", "endpoints": [self.new[1]["endpoints"][1]]},
+            {"provider_name": "provider2", "api_endpoint": "56", "http_config": self.new[2]["http_config"]},
+        ], changed)
+
+    def test_deserialize_patch(self):
+        DataProvider.deserialize_many(self.old, self.filter)
+        self.new[1]["endpoints"][1]["endpoint_url"] = "changed"
+        self.new[2]["http_config"]["header"]["X-Auth-Token"] = "changed"
+        patch = diff_trees(self.old, self.new, self.identity_keys)
+        with CaptureQueriesContext(connection) as queries:
+            DataProvider.deserialize_patch(self.old, patch, self.filter)
+        writes = [query["sql"].split(" ")[0] for query in queries if not query["sql"].startswith("SELECT")]
+        self.assertEqual(["UPDATE", "UPDATE"], [write for write in writes if write in ("INSERT", "UPDATE")])
+        self.assertEqual("changed", Endpoint.objects.get(data_provider__provider_name="provider1",
+                                                         endpoint_name="test2").endpoint_url)
+        self.assertEqual("changed", HttpConfig.objects.get(data_provider__provider_name="provider2")
+                         .header["X-Auth-Token"])
+        self.assertEqual(6, Endpoint.objects.count())
+
+    def test_dict_to_set_of_tuple_nested(self):
+        data = MockDataProvider.build_full_data()
+        self.assertEqual(JsonUtils.dict_to_set_of_tuple(data), JsonUtils.dict_to_set_of_tuple(copy.deepcopy(data)))
+
+    @staticmethod
+    def build_data(count):
+        data = []
+        for i in range(count):
+            tree = MockDataProvider.build_full_data()
+            tree["provider_name"] = f"provider{i}"
+            for endpoint in tree["endpoints"]:
+                del endpoint["request_type"]
+            data.append(tree)
+        return data
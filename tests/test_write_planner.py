@@ -0,0 +1,64 @@
+import django
+from django.db import connection
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from generic_serializer import SerializableModelFilter
+from generic_serializer.write_planner import WritePlanner
+from test_app.models import DataProvider, Endpoint, HttpConfig, OauthConfig, TestModel1, TestModel2, TestModel3
+from tests.mock_data_provider import MockDataProvider
+
+
+class TestWritePlanner(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        django.setup()
+
+    def test_batches_reverse_relations_after_parent(self):
+        planner = WritePlanner()
+        planner.add(DataProvider, MockDataProvider.build_full_data())
+        planner.add(DataProvider, MockDataProvider.build_base_with_endpoints_data())
+        batches = planner.get_batches()
+        self.assertEqual(batches[0][0], DataProvider)
+        self.assertEqual(len(batches[0][1]), 2)
+        self.assertSetEqual({model for model, _ in batches[1:]}, {Endpoint, OauthConfig, HttpConfig})
+        endpoints = [nodes for model, nodes in batches if model is Endpoint][0]
+        self.assertEqual(len(endpoints), 4)
+
+    def test_batches_forward_relations_before_parent(self):
+        planner = WritePlanner()
+        planner.add(TestModel1, self.build_chain_data())
+        self.assertEqual([TestModel3, TestModel2, TestModel1], [model for model, _ in planner.get_batches()])
+
+    def test_execute_forward_chain(self):
+        planner = WritePlanner()
+        node = planner.add(TestModel1, self.build_chain_data())
+        planner.execute()
+        obj1 = TestModel1.objects.get(pk=node.instance.pk)
+        self.assertEqual(obj1.test_model2.text, "2")
+        self.assertEqual(obj1.test_model2.test_model3.text, "3")
+
+    def test_deserialize_forward_chain(self):
+        filter = SerializableModelFilter(max_depth=2, start_object_name="test_model1")
+        obj1 = TestModel1.deserialize(self.build_chain_data(), filter)
+        self.assertEqual(TestModel1.objects.get(pk=obj1.pk).test_model2.test_model3.text, "3")
+
+    def test_deserialize_many_forward_chains_statement_count(self):
+        filter = SerializableModelFilter(max_depth=2, start_object_name="test_model1")
+        data = [self.build_chain_data() for _ in range(10)]
+        with CaptureQueriesContext(connection) as queries:
+            TestModel1.deserialize_many(data, filter)
+        # without primary keys returned from bulk inserts every referenced row is inserted on its own
+        expected_inserts = 1 if TestModel1._can_return_pks_from_bulk_insert(connection) else 10
+        for table in ("test_app_testmodel1", "test_app_testmodel2", "test_app_testmodel3"):
+            inserts = [q for q in queries if q["sql"].startswith(f'INSERT INTO "{table}"')]
+            self.assertEqual(len(inserts), expected_inserts)
+        self.assertEqual(TestModel3.objects.count(), 10)
+        self.assertEqual(TestModel2.objects.count(), 10)
+        self.assertEqual(TestModel1.objects.filter(test_model2__test_model3__text="3").count(), 10)
+
+    @staticmethod
+    def build_chain_data():
+        return {"text": "1", "test_model2": {"text": "2", "test_model3": {"text": "3"}}}